@@ -2,7 +2,7 @@ import json
 import asyncio
 from typing import List, Dict, Any
 import logging
-from src.services.llm_service import LLMService
+from src.services.llm_service import get_llm_service
 from src.services.api_service import api_service
 
 logger = logging.getLogger(__name__)
@@ -22,7 +22,7 @@ async def run(conversation_id: int) -> None:
 
     final_prompt = prompt_text.replace("{{CONVERSATION_HISTORY}}", _format_history(history))
 
-    llm = LLMService()
+    llm = get_llm_service()
     response_dict = await asyncio.to_thread(llm.generate_response, final_prompt, "homework_updater", True)
     raw = response_dict.get("raw_response", "")
     try:
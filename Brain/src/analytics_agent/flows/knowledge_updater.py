@@ -3,7 +3,7 @@ import asyncio
 from typing import Any, Dict, List
 import logging
 from src.services.api_service import api_service
-from src.services.llm_service import LLMService
+from src.services.llm_service import get_llm_service
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +23,7 @@ async def run(conversation_id: int) -> None:
 
     final_prompt = prompt_text.replace("{{CONVERSATION_HISTORY}}", _format_history(history))
 
-    llm = LLMService()
+    llm = get_llm_service()
     response = await asyncio.to_thread(llm.generate_response, final_prompt, "knowledge_updater")
     raw = response.get("raw_response", "") if isinstance(response, dict) else ""
     if not raw:
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
+from functools import cached_property
 import os
 import json
 import boto3
@@ -29,6 +30,28 @@ class FlowConfig(BaseModel):
         description="Configuration for each step in the processing pipeline."
     )
 
+    @cached_property
+    def steps_by_name(self) -> Dict[str, StepConfig]:
+        """Step configs keyed by step name, built once per config instance."""
+        return {step.name: step for step in self.steps}
+
+    @cached_property
+    def config_dump(self) -> Dict[str, Any]:
+        """model_dump() of this config, computed once per instance and shared (treat as read-only)."""
+        return self.model_dump()
+
+    def get_step(self, name: str) -> Optional[StepConfig]:
+        """O(1) lookup of a step's config; None if the step is not configured."""
+        return self.steps_by_name.get(name)
+
+    @property
+    def uses_conversation_history(self) -> bool:
+        """True if any step is configured (and allowed) to use conversation history."""
+        return any(
+            step.use_conversation_history and step.is_use_conversation_history_valid
+            for step in self.steps
+        )
+
     @classmethod
     def init(cls) -> Optional[Dict[str, Any]]:
         """Creates a default configuration and uploads it to S3."""
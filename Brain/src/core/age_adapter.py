@@ -1,7 +1,7 @@
-import os
 from typing import Optional
-import httpx
-from src.services.llm_service import LLMService
+from src.services.api_service import api_service
+from src.services.http_client import backend_get
+from src.services.llm_service import get_llm_service
 from src.utils.logger import logger
 
 PROMPT_NAME_13YO = "generate_response_for_13_year_old"
@@ -9,19 +9,28 @@ PROMPT_NAME_13YO = "generate_response_for_13_year_old"
 
 async def _get_prompt_from_backend(prompt_name: str) -> Optional[str]:
     try:
-        backend_url = os.getenv("BACKEND_CALLBACK_BASE_URL", "http://localhost:5000")
+        backend_url = api_service.backend_url
         url = f"{backend_url}/api/prompts/{prompt_name}/versions/active"
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("prompt_text", "")
+        resp = await backend_get(url)
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("prompt_text", "")
     except Exception as e:
         logger.error(f"Error fetching prompt {prompt_name} from backend: {e}")
         return None
 
 
 async def generate_response_for_13_year_old(current_response: str) -> dict:
+    if not current_response or not current_response.strip():
+        # Nothing to simplify; skip the prompt fetch and the LLM round-trip.
+        return {
+            "original_response": current_response,
+            "simplified_response": current_response,
+            "applied": False,
+            "prompt": None,
+            "error": "Empty response",
+        }
+
     try:
         prompt_template = await _get_prompt_from_backend(PROMPT_NAME_13YO)
         if not prompt_template:
@@ -36,8 +45,8 @@ async def generate_response_for_13_year_old(current_response: str) -> dict:
 
         final_prompt = prompt_template.replace("{{CURRENT_RESPONSE}}", current_response)
 
-        llm = LLMService()
-        llm_resp = llm.generate_response(
+        llm = get_llm_service()
+        llm_resp = await llm.agenerate_response(
             final_prompt=final_prompt, call_type="age_adapter_13yo", json_mode=False
         )
         simplified = (llm_resp or {}).get("raw_response", "").strip()
@@ -1,5 +1,5 @@
 from typing import Optional, List
-from src.services.llm_service import LLMService
+from src.services.llm_service import get_llm_service
 from src.services.api_service import api_service
 from src.utils.logger import logger
 
@@ -90,8 +90,8 @@ async def control_chat_response(
             final_prompt = final_prompt.replace("{{CURRENT_CONVERSATION}}", "No conversation history available.")
         
         # 4. Call LLM to get controlled response
-        llm_service = LLMService()
-        response = llm_service.generate_response(
+        llm_service = get_llm_service()
+        response = await llm_service.agenerate_response(
             final_prompt=final_prompt,
             call_type="chat_controller",
             json_mode=False
@@ -1,24 +1,18 @@
 from typing import Optional, List, Dict, Any, Tuple
-import os
-import httpx
-from src.services.llm_service import LLMService
+from src.services.llm_service import get_llm_service
 from src.services.api_service import api_service
+from src.services.http_client import BACKEND_REQUEST_TIMEOUT, budgeted_timeout, get_http_client
 from src.utils.logger import logger
 from src.core.core_theme_config import CORE_THEME_TRIGGER_MESSAGE_COUNT, CORE_THEME_PROMPT_NAME
 
-async def _format_conversation_for_prompt(conversation_history: list) -> str:
+def _format_conversation_for_prompt(conversation_history: list) -> str:
     """
     Format conversation history for the prompt.
     """
-    formatted_messages = []
-    
-    for msg in conversation_history:
-        if msg.get('is_user', False):
-            formatted_messages.append(f"User: {msg.get('content', '')}")
-        else:
-            formatted_messages.append(f"AI: {msg.get('content', '')}")
-    
-    return "\n".join(formatted_messages)
+    return "\n".join(
+        f"{'User' if msg.get('is_user', False) else 'AI'}: {msg.get('content', '')}"
+        for msg in conversation_history
+    )
 
 async def extract_core_theme_from_conversation(
     conversation_id: int,
@@ -49,7 +43,7 @@ async def extract_core_theme_from_conversation(
             return None, None
         
         # 4. Format conversation for prompt
-        formatted_conversation = await _format_conversation_for_prompt(history)
+        formatted_conversation = _format_conversation_for_prompt(history)
         # 5. Get prompt template from database
         prompt_template = await api_service.get_prompt_template(
             CORE_THEME_PROMPT_NAME,
@@ -63,8 +57,8 @@ async def extract_core_theme_from_conversation(
         final_prompt = prompt_template.replace("{{CONVERSATION_HISTORY}}", formatted_conversation)
         
         # 7. Call LLM to extract theme
-        llm_service = LLMService()
-        response = llm_service.generate_response(
+        llm_service = get_llm_service()
+        response = await llm_service.agenerate_response(
             final_prompt=final_prompt,
             call_type="core_theme_extraction",
             json_mode=False
@@ -88,15 +82,15 @@ async def update_conversation_theme(conversation_id: int, core_theme: str) -> bo
     Updates the conversation's core theme via backend internal API.
     """
     try:
-        backend_url = os.getenv("BACKEND_CALLBACK_BASE_URL", "http://localhost:5000")
+        backend_url = api_service.backend_url
         url = f"{backend_url}/api/internal/conversations/{conversation_id}/core-chat-theme"
         payload = {"core_chat_theme": core_theme}
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.put(url, json=payload)
-            response.raise_for_status()
-            logger.info(f"Successfully updated core theme for conversation {conversation_id}")
-            return True
+        response = await get_http_client().put(url, json=payload, timeout=budgeted_timeout(BACKEND_REQUEST_TIMEOUT))
+        response.raise_for_status()
+        api_service.invalidate_conversation_core_theme(conversation_id)
+        logger.info(f"Successfully updated core theme for conversation {conversation_id}")
+        return True
     except Exception as e:
         logger.error(f"Error updating core theme for conversation {conversation_id}: {e}")
         return False
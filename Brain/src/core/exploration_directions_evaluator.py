@@ -1,42 +1,40 @@
 import json
-import httpx
-import os
+import logging
+import random
 from typing import Optional, List, Dict, Any
-from src.services.llm_service import LLMService
+from pydantic_core import from_json
+from src.services.llm_service import get_llm_service
 from src.services.api_service import api_service
+from src.services.http_client import backend_get
 from src.utils.logger import logger
-from src.utils.prompt_injection import inject_core_theme_placeholder
+from src.utils.prompt_injection import render_prompt_placeholders
 from src.core.exploration_directions_config import EXPLORATION_DIRECTIONS_PROMPT_NAME
 
 async def _get_exploration_prompt_template() -> Optional[str]:
     """Fetch exploration directions prompt template from backend database."""
     try:
-        backend_url = os.getenv("BACKEND_CALLBACK_BASE_URL", "http://localhost:5000")
+        backend_url = api_service.backend_url
         url = f"{backend_url}/api/prompts/{EXPLORATION_DIRECTIONS_PROMPT_NAME}/versions/active"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            prompt_text = data.get("prompt_text", "")
-            logger.info(f"Fetched exploration directions prompt from backend: {len(prompt_text)} chars")
-            return prompt_text
+        response = await backend_get(url)
+        response.raise_for_status()
+        data = from_json(response.content)
+        prompt_text = data.get("prompt_text", "")
+        logger.info(f"Fetched exploration directions prompt from backend: {len(prompt_text)} chars")
+        return prompt_text
     except Exception as e:
         logger.error(f"Error fetching exploration prompt from backend: {e}")
         return None
 
-async def _format_conversation_for_prompt(conversation_history: List[Dict[str, Any]]) -> str:
+def _format_conversation_for_prompt(conversation_history: List[Dict[str, Any]]) -> str:
     """Format conversation history for the prompt."""
     if not conversation_history:
         return "No conversation history yet."
-    
-    formatted_messages = []
-    for msg in conversation_history:  # Last 10 messages
-        role = "User" if msg.get('is_user', False) else "AI"
-        content = msg.get('content', '')
-        formatted_messages.append(f"{role}: {content}")
-    
-    return "\n".join(formatted_messages)
+
+    return "\n".join(
+        f"{'User' if msg.get('is_user', False) else 'AI'}: {msg.get('content', '')}"
+        for msg in conversation_history
+    )
 
 async def evaluate_exploration_directions(
     conversation_id: int,
@@ -66,31 +64,27 @@ async def evaluate_exploration_directions(
             return None
 
         # Format conversation history
-        formatted_history = await _format_conversation_for_prompt(conversation_history)
-
-        # Use the injection system to replace placeholders
-        # First inject core theme
-        formatted_prompt = inject_core_theme_placeholder(prompt_template, core_theme_value)
-        
-        # Then inject conversation history (simple replace since no special injection function exists)
-        if "{{CONVERSATION_HISTORY}}" in formatted_prompt:
-            formatted_prompt = formatted_prompt.replace("{{CONVERSATION_HISTORY}}", formatted_history)
-
-        if "{{QUERY}}" in formatted_prompt:
-            query_text = current_query if current_query else "No current query available"
-            formatted_prompt = formatted_prompt.replace("{{QUERY}}", query_text)
-
-        if "{{CURRENT_CURIOSITY_SCORE}}" in formatted_prompt:
-            bounded_score = max(0, min(100, current_curiosity_score))
-            formatted_prompt = formatted_prompt.replace("{{CURRENT_CURIOSITY_SCORE}}", str(bounded_score))
+        formatted_history = _format_conversation_for_prompt(conversation_history)
+
+        # Render every placeholder in one pass over the template's cached compiled segments
+        formatted_prompt = render_prompt_placeholders(
+            prompt_template,
+            {
+                "CONVERSATION_HISTORY": formatted_history,
+                "QUERY": current_query if current_query else "No current query available",
+                "CURRENT_CURIOSITY_SCORE": str(max(0, min(100, current_curiosity_score))),
+            },
+            core_theme=core_theme_value,
+        )
 
-        logger.debug(f"Final formatted prompt (first 200 chars): {formatted_prompt[:200]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final formatted prompt (first 200 chars): %s...", formatted_prompt[:200])
 
         # Call LLM
-        llm_service = LLMService()
-        logger.debug(f"Calling LLM for exploration directions evaluation")
+        llm_service = get_llm_service()
+        logger.debug("Calling LLM for exploration directions evaluation")
 
-        response = llm_service.generate_response(
+        response = await llm_service.agenerate_response(
             final_prompt=formatted_prompt,
             call_type="exploration_directions_evaluation",
             json_mode=False
@@ -146,14 +140,13 @@ async def evaluate_exploration_directions(
                 curiosity_error = 'Unexpected JSON structure'
         except json.JSONDecodeError:
             logger.error(f"Failed to parse JSON response for conversation {conversation_id}")
-            logger.debug(f"Raw response: {raw_response}")
+            logger.debug("Raw response: %s", raw_response)
             # Attempt legacy parsing for directions if JSON parsing fails
             directions = [d.strip() for d in raw_response.split('#') if d.strip()]
             curiosity_error = 'JSON decode error'
 
         # Use a random default tip if no tip was provided
         if not curiosity_tip:
-            import random
             curiosity_tip = random.choice(default_tips)
 
         evaluation_successful = len(directions) > 0
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class PromptExecutionContext:
     prompt_template: str
     prompt_name: str = "simplified_conversation"
@@ -22,7 +22,7 @@ class PromptExecutionContext:
         return "{{CORE_THEME" in self.prompt_template
 
 
-@dataclass
+@dataclass(slots=True)
 class TurnExecutionContext:
     user_input: str
     purpose: str
@@ -1,6 +1,6 @@
 import json
 from src.services.api_service import api_service
-from src.services.llm_service import LLMService
+from src.services.llm_service import get_llm_service
 from src.utils.logger import logger
 from src.schemas import UserPersonaData
 
@@ -61,10 +61,10 @@ async def generate_persona_for_user(user_id: int):
 
     # 5. Call the LLM to get the persona
     try:
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         logger.info(f"Calling LLM for persona generation for user {user_id}.")
         # Use json_mode to enforce a JSON response
-        raw_response = llm_service.get_completion(
+        raw_response = await llm_service.aget_completion(
             messages,
             call_type="user_persona_generation",
             json_mode=True
@@ -75,7 +75,7 @@ async def generate_persona_for_user(user_id: int):
 
     except json.JSONDecodeError as e:
         logger.error(f"Failed to decode JSON from LLM response for user {user_id}. Error: {e}")
-        logger.debug(f"Raw LLM response was: {raw_response}")
+        logger.debug("Raw LLM response was: %s", raw_response)
         return
     except Exception as e:
         logger.error(f"An error occurred during LLM call for user {user_id}: {e}")
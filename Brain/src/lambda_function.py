@@ -3,6 +3,7 @@ import logging
 import os
 import sys
 import asyncio
+from typing import Optional
 
 # Add Mangum for FastAPI integration
 from mangum import Mangum
@@ -20,11 +21,45 @@ from src.main import (
     process_class_analysis_task, process_student_analysis_task,
 )
 from src.core.user_persona_generator import generate_persona_for_user
+from src.services.http_client import close_http_client, reset_backend_deadline, set_backend_deadline
+from src.services.llm_service import close_async_llm_clients
 from pydantic import ValidationError
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# uvloop ships with uvicorn[standard] and is what uvicorn already runs the app on locally;
+# use it for the per-record asyncio.run() loops (and Mangum's) here as well.
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    logger.info("uvloop not installed; using the default asyncio event loop")
+
+# Seconds kept back from the invocation's remaining time so a record's backend reads give up
+# (and the record is logged as failed) before Lambda kills the whole batch.
+LAMBDA_DEADLINE_MARGIN_SECONDS = float(os.getenv("LAMBDA_DEADLINE_MARGIN_SECONDS", "5"))
+
+
+def _record_budget(context) -> Optional[float]:
+    """Seconds the current record's backend calls may use, or None outside Lambda."""
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining is None:
+        return None
+    return get_remaining() / 1000 - LAMBDA_DEADLINE_MARGIN_SECONDS
+
+
+async def _run_record(coro, budget_seconds: Optional[float] = None):
+    """Await a record's task, then close the shared HTTP and LLM clients before its loop goes away."""
+    token = set_backend_deadline(budget_seconds) if budget_seconds is not None else None
+    try:
+        return await coro
+    finally:
+        if token is not None:
+            reset_backend_deadline(token)
+        await close_http_client()
+        await close_async_llm_clients()
+
 # Create the Mangum handler for the FastAPI app
 asgi_handler = Mangum(app)
 
@@ -68,7 +103,7 @@ def lambda_handler(event, context):
                     conversation_ids = message_body.get("conversation_ids", [])
                     if conversation_ids:
                         logger.info(f"Detected GENERATE_MEMORY_BATCH task for {len(conversation_ids)} conversations.")
-                        asyncio.run(process_memory_generation_batch(conversation_ids))
+                        asyncio.run(_run_record(process_memory_generation_batch(conversation_ids), _record_budget(context)))
                         processed_messages += 1
                     else:
                         logger.warning("GENERATE_MEMORY_BATCH task received with no conversation_ids.")
@@ -79,7 +114,7 @@ def lambda_handler(event, context):
                     user_id = message_body.get("user_id")
                     if user_id:
                         logger.info(f"Detected USER_PERSONA_GENERATION task for user_id: {user_id}.")
-                        asyncio.run(generate_persona_for_user(user_id))
+                        asyncio.run(_run_record(generate_persona_for_user(user_id), _record_budget(context)))
                         processed_messages += 1
                     else:
                         logger.warning("USER_PERSONA_GENERATION task received with no user_id.")
@@ -94,7 +129,7 @@ def lambda_handler(event, context):
                     last_message_hash = message_body.get("last_message_hash")
                     if job_id and school and grade is not None:
                         logger.info(f"Detected CLASS_ANALYSIS task for job_id: {job_id}")
-                        asyncio.run(process_class_analysis_task(job_id, school, grade, section, last_message_hash))
+                        asyncio.run(_run_record(process_class_analysis_task(job_id, school, grade, section, last_message_hash), _record_budget(context)))
                         processed_messages += 1
                     else:
                         logger.warning("CLASS_ANALYSIS task received with missing job_id, school, or grade.")
@@ -107,7 +142,7 @@ def lambda_handler(event, context):
                     last_message_hash = message_body.get("last_message_hash")
                     if job_id and student_id:
                         logger.info(f"Detected STUDENT_ANALYSIS task for job_id: {job_id}")
-                        asyncio.run(process_student_analysis_task(job_id, student_id, last_message_hash))
+                        asyncio.run(_run_record(process_student_analysis_task(job_id, student_id, last_message_hash), _record_budget(context)))
                         processed_messages += 1
                     else:
                         logger.warning("STUDENT_ANALYSIS task received with missing job_id or student_id.")
@@ -130,7 +165,7 @@ def lambda_handler(event, context):
                 logger.info(f"Processing message ID: {record.get('messageId')}")
                 # Pass the parsed Pydantic object to dequeue
                 # Use asyncio.run() to call the async dequeue function
-                asyncio.run(dequeue(parsed_message))
+                asyncio.run(_run_record(dequeue(parsed_message), _record_budget(context)))
                 processed_messages += 1
 
             except Exception as e:
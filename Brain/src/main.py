@@ -3,6 +3,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from pydantic_core import from_json, to_json
 import uvicorn
 import httpx # Added for callback
 from typing import Optional, List, Dict, Any, Tuple
@@ -24,21 +25,24 @@ from src.core.core_theme_config import CORE_THEME_EXTRACTION_ENABLED, CORE_THEME
 from src.core.chat_controller import control_chat_response
 from src.core.age_adapter import generate_response_for_13_year_old
 from src.process_query_entrypoint import (
+    FORCE_SIMPLIFIED_MODE,
     process_query,
     process_follow_up,
     ProcessQueryResponse,
     resolve_prompt_execution_context,
 )
-from src.core.turn_context import TurnExecutionContext
+from src.core.turn_context import PromptExecutionContext, TurnExecutionContext
 from src.utils.logger import logger
 from src.config_models import FlowConfig
-from src.services.llm_service import LLMService
+from src.services.llm_service import LLMService, close_async_llm_clients, get_llm_service
+from src.services.http_client import backend_get, budgeted_timeout, close_http_client, get_http_client
 from src.services.api_service import api_service
 from src.schemas import ConversationMemoryData, OpeningMessageRequest, ClassAnalysisRequest, ClassAnalysisResponse, StudentAnalysisRequest, StudentAnalysisResponse
 from src.core.user_persona_generator import generate_persona_for_user
 from pydantic import ValidationError
-from src.utils.prompt_injection import inject_core_theme_placeholder
+from src.utils.prompt_injection import inject_core_theme_placeholder, inject_previous_memories_placeholder, inject_persona_placeholders
 from src.core.exploration_directions_config import EXPLORATION_DIRECTIONS_ENABLED
+from src.core.exploration_directions_evaluator import evaluate_exploration_directions
 from src.analytics_agent import runner as analytics_runner
 # Load environment variables from .env file
 load_dotenv()
@@ -51,6 +55,9 @@ BACKEND_CALLBACK_URL = f"{BACKEND_CALLBACK_BASE_URL}{BACKEND_CALLBACK_ROUTE}"
 
 EVALUATION_MAX_WORKERS = int(os.getenv("EVALUATION_MAX_WORKERS", "3"))
 EVALUATION_EXECUTOR = ThreadPoolExecutor(max_workers=EVALUATION_MAX_WORKERS)
+
+# Conversations whose memory is generated concurrently within one batch task
+MEMORY_GENERATION_CONCURRENCY = int(os.getenv("MEMORY_GENERATION_CONCURRENCY", "8"))
 EVALUATION_LLM_SERVICE: Optional[LLMService] = None
 
 DEFAULT_CURIOSITY_SCORE_INCREMENT = 4
@@ -425,15 +432,12 @@ async def _build_turn_execution_context(
     prefetched_history: Optional[List[Dict[str, Any]]],
     user_persona: Optional[Dict[str, Any]],
     current_curiosity_score: int,
+    prompt_context: Optional[PromptExecutionContext],
+    core_theme: Optional[str],
 ) -> TurnExecutionContext:
     conversation_id = int(message.conversation_id) if message.conversation_id else None
     user_id = int(message.user_id) if message.user_id else None
 
-    prompt_context = await resolve_prompt_execution_context(
-        purpose=purpose,
-        conversation_id=conversation_id,
-    )
-
     context = TurnExecutionContext(
         user_input=user_input,
         purpose=purpose,
@@ -444,40 +448,47 @@ async def _build_turn_execution_context(
         user_persona=user_persona,
         current_curiosity_score=current_curiosity_score,
         prompt_context=prompt_context,
+        core_theme=core_theme,
     )
 
-    if context.conversation_id:
+    async def _fetch_conversation_memory() -> Optional[Dict[str, Any]]:
         try:
-            context.core_theme = await api_service.get_conversation_core_theme(context.conversation_id)
+            return await api_service.get_conversation_memory(context.conversation_id)
         except Exception as exc:
             logger.warning(
-                f"Error fetching core theme for conversation {context.conversation_id}: {exc}"
+                f"Error fetching conversation memory for conv {context.conversation_id}: {exc}"
             )
+            return None
 
-    if context.prompt_context and context.prompt_context.requires_conversation_memory and context.conversation_id:
+    async def _fetch_previous_memories() -> Optional[List[Dict[str, Any]]]:
         try:
-            context.conversation_memory = await api_service.get_conversation_memory(context.conversation_id)
+            return await api_service.get_previous_memories(
+                context.user_id,
+                context.conversation_id,
+            )
         except Exception as exc:
             logger.warning(
-                f"Error fetching conversation memory for conv {context.conversation_id}: {exc}"
+                "Error fetching previous conversation memories for "
+                f"user {context.user_id}, conversation {context.conversation_id}: {exc}"
             )
+            return None
 
+    # Which memories are needed depends on the prompt's placeholders; fetch the required ones concurrently
+    memory_fetches = {}
+    if context.prompt_context and context.prompt_context.requires_conversation_memory and context.conversation_id:
+        memory_fetches["conversation_memory"] = _fetch_conversation_memory()
     if (
         context.prompt_context
         and context.prompt_context.requires_previous_memories
         and context.user_id
         and context.conversation_id
     ):
-        try:
-            context.previous_memories = await api_service.get_previous_memories(
-                context.user_id,
-                context.conversation_id,
-            )
-        except Exception as exc:
-            logger.warning(
-                "Error fetching previous conversation memories for "
-                f"user {context.user_id}, conversation {context.conversation_id}: {exc}"
-            )
+        memory_fetches["previous_memories"] = _fetch_previous_memories()
+
+    if memory_fetches:
+        results = await asyncio.gather(*memory_fetches.values())
+        for field_name, value in zip(memory_fetches.keys(), results):
+            setattr(context, field_name, value)
 
     context.previous_exploration_directions = _extract_previous_exploration_directions(
         context.prefetched_history
@@ -488,6 +499,107 @@ async def _build_turn_execution_context(
     return context
 
 
+async def _generate_turn_response(
+    message: "MessagePayload",
+    user_input: str,
+    flow_config: Optional[FlowConfig],
+    turn_context: TurnExecutionContext,
+) -> ProcessQueryResponse:
+    if message.is_follow_up_response:
+        # This is a response to a follow-up question
+        logger.info("Processing as a follow-up response")
+        if not message.original_query or not message.follow_up_questions:
+            raise HTTPException(status_code=400, detail="Follow-up response requires original_query and follow_up_questions")
+
+        return await process_follow_up(
+            original_query=message.original_query,
+            follow_up_questions=message.follow_up_questions,
+            student_response=user_input,
+            config=flow_config,
+            conversation_history=turn_context.conversation_history,
+            purpose=message.purpose,
+            user_persona=turn_context.user_persona,
+            conversation_memory=turn_context.conversation_memory,
+            conversation_id=turn_context.conversation_id,
+            user_id=turn_context.user_id,
+            current_curiosity_score=turn_context.current_curiosity_score,
+            prompt_context=turn_context.prompt_context,
+            core_theme=turn_context.core_theme,
+            previous_memories=turn_context.previous_memories,
+        )
+
+    # This is a new query
+    logger.info("Processing as a new query")
+    return await process_query(
+        query=user_input,
+        config=flow_config,
+        conversation_history=turn_context.conversation_history,
+        purpose=message.purpose,
+        user_persona=turn_context.user_persona,
+        conversation_memory=turn_context.conversation_memory,
+        conversation_id=turn_context.conversation_id,
+        user_id=turn_context.user_id,
+        current_curiosity_score=turn_context.current_curiosity_score,
+        prompt_context=turn_context.prompt_context,
+        core_theme=turn_context.core_theme,
+        previous_memories=turn_context.previous_memories,
+    )
+
+
+async def _extract_core_theme_for_turn(
+    conversation_id: int,
+    prefetched_history: List[Dict[str, Any]],
+) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+    """
+    Run core theme extraction when the conversation hits the trigger message count.
+
+    Returns the pipeline step plus the theme (only if it was persisted), or None
+    when extraction was not triggered.
+    """
+    # Use prefetched history when available to count user messages
+    conversation_history = prefetched_history or []
+    if not conversation_history:
+        conversation_history = await api_service.get_conversation_history(conversation_id) or []
+
+    if not conversation_history:
+        return None
+
+    user_message_count = len([
+        msg for msg in conversation_history if msg.get('is_user', False)
+    ])
+    if user_message_count != CORE_THEME_TRIGGER_MESSAGE_COUNT:
+        return None
+
+    logger.info(f"{CORE_THEME_TRIGGER_MESSAGE_COUNT}th user message detected for conversation {conversation_id}. Triggering core theme extraction.")
+
+    core_theme, core_theme_prompt = await extract_core_theme_from_conversation(
+        conversation_id,
+        conversation_history=prefetched_history,
+    )
+
+    core_theme_step = {
+        'name': 'core_theme_extraction',
+        'enabled': True,
+        'prompt': core_theme_prompt if core_theme_prompt else 'Core theme extraction prompt not available',
+        'result': core_theme if core_theme else 'No core theme extracted',
+        'core_theme': core_theme,
+        'extraction_successful': core_theme is not None
+    }
+
+    if not core_theme:
+        logger.warning(f"Core theme extraction failed for conversation {conversation_id}")
+        return core_theme_step, None
+
+    # Update conversation with extracted theme
+    success = await update_conversation_theme(conversation_id, core_theme)
+    if not success:
+        logger.error(f"Failed to update conversation {conversation_id} with core theme")
+        return core_theme_step, None
+
+    logger.info(f"Successfully updated conversation {conversation_id} with core theme: '{core_theme}'")
+    return core_theme_step, core_theme
+
+
 def _build_callback_payload(
     *,
     message: "MessagePayload",
@@ -495,13 +607,14 @@ def _build_callback_payload(
     curiosity_score: int,
     user_input: str,
 ) -> Dict[str, Any]:
+    pipeline_data = response_data.model_dump()
     if response_data.needs_clarification and response_data.follow_up_questions:
         return {
             "user_id": int(message.user_id),
             "conversation_id": message.conversation_id,
             "original_message_id": int(message.message_id) if message.message_id.isdigit() else None,
             "llm_response": response_data.final_response,
-            "pipeline_data": response_data.model_dump(),
+            "pipeline_data": pipeline_data,
             "needs_clarification": True,
             "follow_up_questions": response_data.follow_up_questions,
             "original_query": message.original_query if message.is_follow_up_response else user_input,
@@ -513,11 +626,18 @@ def _build_callback_payload(
         "conversation_id": message.conversation_id,
         "original_message_id": int(message.message_id) if message.message_id.isdigit() else None,
         "llm_response": response_data.final_response,
-        "pipeline_data": response_data.model_dump(),
+        "pipeline_data": pipeline_data,
         "needs_clarification": False,
         "curiosity_score": curiosity_score,
     }
 
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core's Rust serializer instead of the stdlib json module."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
 app = FastAPI()
 
 # Configure CORS
@@ -655,6 +775,13 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error during startup initialization: {str(e)}")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled backend and LLM connections on application shutdown"""
+    await close_http_client()
+    await close_async_llm_clients()
+
 # --- Payload Models ---
 class MessagePayload(BaseModel):
     user_id: str
@@ -687,6 +814,105 @@ class BatchTaskRequest(BaseModel):
     student_id: Optional[int] = None
 
 # Updated dequeue function containing the core logic
+async def _fetch_user_persona_for_message(message: MessagePayload) -> Optional[Dict[str, Any]]:
+    """Fetch the persona of the message's user, or None if unavailable."""
+    if not message.user_id:
+        return None
+    try:
+        # user_id from payload is a string, but service expects int
+        user_id_int = int(message.user_id)
+        logger.info(f"Fetching persona for user_id: {user_id_int}")
+        user_persona = await api_service.get_user_persona(user_id_int)
+        if user_persona:
+            logger.info(f"Successfully fetched persona for user {user_id_int}")
+        return user_persona
+    except ValueError:
+        logger.error(f"Could not convert user_id '{message.user_id}' to integer.")
+    except Exception as e:
+        logger.error(f"An error occurred while fetching user persona: {e}", exc_info=True)
+    return None
+
+
+async def _fetch_conversation_history_for_message(
+    message: MessagePayload,
+) -> Tuple[Optional[str], Optional[List[Dict[str, Any]]]]:
+    """
+    Fetch the conversation's messages (with pipeline data) for this turn.
+
+    Returns the formatted history (excluding the message being processed) and the raw
+    fetched messages; either is None if unavailable.
+    """
+    conversation_history_str: Optional[str] = None
+    prefetched_history: Optional[List[Dict[str, Any]]] = None
+    logger.info(
+        f"Fetching conversation history (with pipeline) for conversation_id: {message.conversation_id}"
+    )
+    try:
+        # Use the internal endpoint that includes pipeline data for each message
+        history_url = (
+            f"{BACKEND_CALLBACK_BASE_URL.rstrip('/')}/api/internal/conversations/"
+            f"{message.conversation_id}/messages_with_pipeline"
+        )
+
+        response = await backend_get(history_url)
+
+        if response.status_code == 200:
+            history_data = from_json(response.content)
+            if history_data.get("success") and "messages" in history_data:
+                fetched_messages = history_data["messages"]
+                prefetched_history = fetched_messages
+                # Filter out the current message being processed, if present
+                # Assuming message.message_id is a string, and history message IDs are int.
+                current_message_id_int: Optional[int] = None
+                if message.message_id and message.message_id.isdigit():
+                    current_message_id_int = int(message.message_id)
+
+                relevant_messages = []
+                for msg_data in fetched_messages:
+                    if current_message_id_int is None or msg_data.get('id') != current_message_id_int:
+                        sender = "User" if msg_data.get('is_user') else "AI"
+                        relevant_messages.append(f"{sender}: {msg_data.get('content')}")
+
+                if relevant_messages:
+                    conversation_history_str = "\n".join(relevant_messages)
+                    logger.info(f"Successfully fetched and formatted conversation history. Length: {len(conversation_history_str)}")
+                else:
+                    logger.info("No prior messages found in history to use.")
+            else:
+                logger.warning(
+                    "Failed to fetch conversation history: API response indicates failure or malformed "
+                    f"data. Response: {response.text}"
+                )
+        else:
+            logger.error(
+                f"Error fetching conversation history: API responded with status {response.status_code}. "
+                f"Response: {response.text}"
+            )
+    except httpx.RequestError as e:
+        logger.error(f"HTTPX RequestError fetching conversation history: {e}", exc_info=True)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching or processing conversation history: {e}", exc_info=True)
+    return conversation_history_str, prefetched_history
+
+
+async def _no_conversation_history() -> Tuple[Optional[str], Optional[List[Dict[str, Any]]]]:
+    return None, None
+
+
+async def _fetch_core_theme_for_message(message: MessagePayload) -> Optional[str]:
+    """Fetch the conversation's stored core theme, or None if unavailable."""
+    if not message.conversation_id:
+        return None
+    conversation_id = int(message.conversation_id)
+    try:
+        return await api_service.get_conversation_core_theme(conversation_id)
+    except Exception as exc:
+        logger.warning(
+            f"Error fetching core theme for conversation {conversation_id}: {exc}"
+        )
+        return None
+
+
 async def dequeue(message: MessagePayload, background_tasks: Optional[BackgroundTasks] = None):
     """
     Processes a message received either from SQS or the /query endpoint.
@@ -716,36 +942,10 @@ async def dequeue(message: MessagePayload, background_tasks: Optional[Background
                 # process_query will use its internal default FlowConfig.
                 logger.info("No S3 config dictionary loaded, process_query will use default FlowConfig.")
 
-            # Fetch user persona
-            user_persona: Optional[Dict[str, Any]] = None
-            if message.user_id:
-                try:
-                    # user_id from payload is a string, but service expects int
-                    user_id_int = int(message.user_id)
-                    logger.info(f"Fetching persona for user_id: {user_id_int}")
-                    user_persona = await api_service.get_user_persona(user_id_int)
-                    if user_persona:
-                        logger.info(f"Successfully fetched persona for user {user_id_int}")
-                except ValueError:
-                    logger.error(f"Could not convert user_id '{message.user_id}' to integer.")
-                except Exception as e:
-                    logger.error(f"An error occurred while fetching user persona: {e}", exc_info=True)
-
-            # Initialize conversation history placeholders
-            conversation_history_str: Optional[str] = None
-            prefetched_history: Optional[List[Dict[str, Any]]] = None
-            
             # Check if any step wants to use conversation history
-            should_fetch_history = False
-            if flow_config_instance and flow_config_instance.steps:
-                for step_config in flow_config_instance.steps:
-                    if step_config.use_conversation_history and step_config.is_use_conversation_history_valid:
-                        should_fetch_history = True
-                        break
+            should_fetch_history = bool(flow_config_instance and flow_config_instance.uses_conversation_history)
             
             # Always fetch history in simplified mode to maintain conversation context
-            from src.process_query_entrypoint import FORCE_SIMPLIFIED_MODE
-
             # Check simplified mode even when config is None (e.g., S3 config failed to load)
             is_simplified_mode = FORCE_SIMPLIFIED_MODE
             if flow_config_instance:
@@ -757,59 +957,23 @@ async def dequeue(message: MessagePayload, background_tasks: Optional[Background
             
             logger.info(f"🔍 History fetch decision: should_fetch={should_fetch_history}, has_conv_id={bool(message.conversation_id)}, is_simplified={is_simplified_mode}")
 
-            if should_fetch_history and message.conversation_id:
-                logger.info(
-                    f"Fetching conversation history (with pipeline) for conversation_id: {message.conversation_id}"
-                )
-                try:
-                    # Use the internal endpoint that includes pipeline data for each message
-                    history_url = (
-                        f"{BACKEND_CALLBACK_BASE_URL.rstrip('/')}/api/internal/conversations/"
-                        f"{message.conversation_id}/messages_with_pipeline"
-                    )
-                    
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(history_url)
-                    
-                    if response.status_code == 200:
-                        history_data = response.json()
-                        if history_data.get("success") and "messages" in history_data:
-                            fetched_messages = history_data["messages"]
-                            prefetched_history = fetched_messages
-                            # Filter out the current message being processed, if present
-                            # Assuming message.message_id is a string, and history message IDs are int.
-                            current_message_id_int: Optional[int] = None
-                            if message.message_id and message.message_id.isdigit():
-                                current_message_id_int = int(message.message_id)
-
-                            relevant_messages = []
-                            for msg_data in fetched_messages:
-                                if current_message_id_int is None or msg_data.get('id') != current_message_id_int:
-                                    sender = "User" if msg_data.get('is_user') else "AI"
-                                    relevant_messages.append(f"{sender}: {msg_data.get('content')}")
-                            
-                            if relevant_messages:
-                                conversation_history_str = "\n".join(relevant_messages)
-                                logger.info(f"Successfully fetched and formatted conversation history. Length: {len(conversation_history_str)}")
-                            else:
-                                logger.info("No prior messages found in history to use.")
-                        else:
-                            logger.warning(
-                                "Failed to fetch conversation history: API response indicates failure or malformed "
-                                f"data. Response: {response.text}"
-                            )
-                    else:
-                        logger.error(
-                            f"Error fetching conversation history: API responded with status {response.status_code}. "
-                            f"Response: {response.text}"
-                        )
-                except httpx.RequestError as e:
-                    logger.error(f"HTTPX RequestError fetching conversation history: {e}", exc_info=True)
-                except Exception as e:
-                    logger.error(f"Unexpected error fetching or processing conversation history: {e}", exc_info=True)
-
-            # Determine if this is a new query or a follow-up response
-            response_data = None
+            # Persona, history, prompt and core theme only depend on the message; fetch them
+            # concurrently so the turn waits for the slowest read rather than their sum.
+            fetch_history = should_fetch_history and bool(message.conversation_id)
+            (
+                user_persona,
+                (conversation_history_str, prefetched_history),
+                prompt_context,
+                core_theme,
+            ) = await asyncio.gather(
+                _fetch_user_persona_for_message(message),
+                _fetch_conversation_history_for_message(message) if fetch_history else _no_conversation_history(),
+                resolve_prompt_execution_context(
+                    purpose=message.purpose,
+                    conversation_id=int(message.conversation_id) if message.conversation_id else None,
+                ),
+                _fetch_core_theme_for_message(message),
+            )
 
             current_curiosity_score = await get_current_curiosity_score(
                 message.conversation_id,
@@ -824,98 +988,40 @@ async def dequeue(message: MessagePayload, background_tasks: Optional[Background
                 prefetched_history=prefetched_history,
                 user_persona=user_persona,
                 current_curiosity_score=current_curiosity_score,
+                prompt_context=prompt_context,
+                core_theme=core_theme,
             )
 
-            if message.is_follow_up_response:
-                # This is a response to a follow-up question
-                logger.info("Processing as a follow-up response")
-                if not message.original_query or not message.follow_up_questions:
-                    raise HTTPException(status_code=400, detail="Follow-up response requires original_query and follow_up_questions")
-                
-                response_data = await process_follow_up(
-                    original_query=message.original_query,
-                    follow_up_questions=message.follow_up_questions,
-                    student_response=user_input,
-                    config=flow_config_instance,
-                    conversation_history=turn_context.conversation_history,
-                    purpose=message.purpose,
-                    user_persona=turn_context.user_persona,
-                    conversation_memory=turn_context.conversation_memory,
-                    conversation_id=turn_context.conversation_id,
-                    user_id=turn_context.user_id,
-                    current_curiosity_score=current_curiosity_score,
-                    prompt_context=turn_context.prompt_context,
-                    core_theme=turn_context.core_theme,
-                    previous_memories=turn_context.previous_memories,
-                )
-            else:
-                # This is a new query
-                logger.info("Processing as a new query")
-                response_data = await process_query(
-                    query=user_input, 
-                    config=flow_config_instance, 
-                    conversation_history=turn_context.conversation_history,
-                    purpose=message.purpose,
-                    user_persona=turn_context.user_persona,
-                    conversation_memory=turn_context.conversation_memory,
-                    conversation_id=turn_context.conversation_id,
-                    user_id=turn_context.user_id,
-                    current_curiosity_score=current_curiosity_score,
-                    prompt_context=turn_context.prompt_context,
-                    core_theme=turn_context.core_theme,
-                    previous_memories=turn_context.previous_memories,
+            # Core theme extraction only depends on the conversation history, so run it
+            # alongside response generation instead of after it.
+            core_theme_task: Optional[asyncio.Task] = None
+            if message.conversation_id and message.purpose in ["chat", "test-prompt"] and CORE_THEME_EXTRACTION_ENABLED:
+                core_theme_task = asyncio.create_task(
+                    _extract_core_theme_for_turn(int(message.conversation_id), turn_context.prefetched_history)
                 )
 
+            try:
+                response_data = await _generate_turn_response(message, user_input, flow_config_instance, turn_context)
+            except Exception:
+                if core_theme_task is not None:
+                    core_theme_task.cancel()
+                raise
+
             _apply_curiosity_signal_to_response(response_data)
 
-            # Extract core theme from conversation
-            if message.conversation_id and message.purpose in ["chat", "test-prompt"] and CORE_THEME_EXTRACTION_ENABLED:
+            if core_theme_task is not None:
                 try:
-                    # Use prefetched history when available to count user messages
-                    conversation_history = turn_context.prefetched_history or []
-                    if not conversation_history and message.conversation_id:
-                        conversation_history = await api_service.get_conversation_history(int(message.conversation_id)) or []
-
-                    if conversation_history:
-                        user_message_count = len([
-                            msg for msg in conversation_history if msg.get('is_user', False)
-                        ])
-                        
-                        if user_message_count == CORE_THEME_TRIGGER_MESSAGE_COUNT:
-                            logger.info(f"{CORE_THEME_TRIGGER_MESSAGE_COUNT}th user message detected for conversation {message.conversation_id}. Triggering core theme extraction.")
-                            
-                            # Extract core theme
-                            core_theme, core_theme_prompt = await extract_core_theme_from_conversation(
-                                int(message.conversation_id),
-                                conversation_history=turn_context.prefetched_history,
-                            )
-                            
-                            # Create core theme extraction step
-                            core_theme_step = {
-                                'name': 'core_theme_extraction',
-                                'enabled': True,
-                                'prompt': core_theme_prompt if core_theme_prompt else 'Core theme extraction prompt not available',
-                                'result': core_theme if core_theme else 'No core theme extracted',
-                                'core_theme': core_theme,
-                                'extraction_successful': core_theme is not None
-                            }
-                            _append_pipeline_step(response_data, core_theme_step)
-
-                            if core_theme:
-                                # Update conversation with extracted theme
-                                success = await update_conversation_theme(int(message.conversation_id), core_theme)
-                                if success:
-                                    turn_context.core_theme = core_theme
-                                    logger.info(f"Successfully updated conversation {message.conversation_id} with core theme: '{core_theme}'")
-                                else:
-                                    logger.error(f"Failed to update conversation {message.conversation_id} with core theme")
-                            else:
-                                logger.warning(f"Core theme extraction failed for conversation {message.conversation_id}")
+                    core_theme_outcome = await core_theme_task
+                    if core_theme_outcome is not None:
+                        core_theme_step, extracted_core_theme = core_theme_outcome
+                        _append_pipeline_step(response_data, core_theme_step)
+                        if extracted_core_theme:
+                            turn_context.core_theme = extracted_core_theme
                 except Exception as e:
                     logger.error(f"Error in core theme extraction for conversation {message.conversation_id}: {e}", exc_info=True)
                     # Don't fail the main message processing if theme extraction fails
-                        
-            
+
+
             # Apply chat controller if core theme exis
             if message.conversation_id and response_data:
                 try:
@@ -988,7 +1094,6 @@ async def dequeue(message: MessagePayload, background_tasks: Optional[Background
             exploration_directions_list = None
             if message.conversation_id and message.purpose in ["chat", "test-prompt"] and EXPLORATION_DIRECTIONS_ENABLED:
                 try:
-                    from src.core.exploration_directions_evaluator import evaluate_exploration_directions
                     conversation_history_with_latest = _build_history_with_latest_turn(
                         turn_context.prefetched_history,
                         user_input,
@@ -1094,7 +1199,8 @@ async def dequeue(message: MessagePayload, background_tasks: Optional[Background
                 except Exception as cb_exc:
                     logger.error(f"Error during awaited callback execution (SQS context): {cb_exc}", exc_info=True)
 
-            return response_data.model_dump()
+            # Same dump the callback carries; avoid walking the response model a second time
+            return callback_payload["pipeline_data"]
         else:
             # Handle other purposes like "test_generation", "doubt_solver", "other"
             logger.info(f"Received message with purpose '{message.purpose}', not processing further.")
@@ -1116,10 +1222,14 @@ async def perform_backend_callback(payload: dict):
     logger.info(f"Performing callback to backend for user: {payload.get('user_id')}")
     logger.info(f"Attempting callback to URL: {BACKEND_CALLBACK_URL}")
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(BACKEND_CALLBACK_URL, json=payload)
-            response.raise_for_status() # Raise exception for 4xx/5xx errors
-            logger.info(f"Backend callback successful, status: {response.status_code}")
+        response = await get_http_client().post(
+            BACKEND_CALLBACK_URL,
+            content=to_json(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=budgeted_timeout(10.0),
+        )
+        response.raise_for_status() # Raise exception for 4xx/5xx errors
+        logger.info(f"Backend callback successful, status: {response.status_code}")
     except httpx.RequestError as exc:
         logger.error(f"Callback request error to {BACKEND_CALLBACK_URL}: {exc}")
     except httpx.HTTPStatusError as exc:
@@ -1233,8 +1343,6 @@ async def generate_opening_message(payload: OpeningMessageRequest):
         "callback_url": str
     }
     """
-    from src.utils.prompt_injection import inject_previous_memories_placeholder, inject_persona_placeholders
-    
     logger.info(f"Opening message generation requested for conversation {payload.conversation_id}, visit {payload.visit_number}")
     
     # 0. Check if opening message already exists (idempotency)
@@ -1286,10 +1394,10 @@ async def generate_opening_message(payload: OpeningMessageRequest):
         # 5. Generate opening message with LLM
         # The visit-based prompt is designed to produce a welcoming opening message
         # that uses persona/memory context if available
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         
         # Use the formatted prompt (with all placeholders injected)
-        llm_response = llm_service.generate_response(
+        llm_response = await llm_service.agenerate_response(
             final_prompt=formatted_prompt,
             call_type="opening_message",  # Use opening_message configuration
             json_mode=False
@@ -1341,17 +1449,17 @@ async def generate_opening_message(payload: OpeningMessageRequest):
                 "steps_count": len(callback_payload.get("pipeline_data", {}).get("steps", []))
             })
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    payload.callback_url,
-                    json=callback_payload,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                logger.info(f"Successfully sent opening message callback for conversation {payload.conversation_id}", extra={
-                    "response_status": response.status_code,
-                    "message_id": response.json().get("message_id")
-                })
+            response = await get_http_client().post(
+                payload.callback_url,
+                content=to_json(callback_payload),
+                headers={"Content-Type": "application/json"},
+                timeout=budgeted_timeout(30.0)
+            )
+            response.raise_for_status()
+            logger.info(f"Successfully sent opening message callback for conversation {payload.conversation_id}", extra={
+                "response_status": response.status_code,
+                "message_id": from_json(response.content).get("message_id")
+            })
         except Exception as callback_error:
             logger.error(f"Error sending callback for opening message: {callback_error}", extra={
                 "conversation_id": payload.conversation_id,
@@ -1381,7 +1489,7 @@ async def handle_query(message: MessagePayload, background_tasks: BackgroundTask
 
         # Return the immediate result from dequeue (could be success/error/non-chat info)
         # Use JSONResponse to ensure correct content type and structure
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
     except HTTPException as http_exc:
         # Re-raise HTTPExceptions raised by dequeue
         logger.error(f"HTTPException during dequeue: {http_exc.detail}")
@@ -1408,7 +1516,7 @@ async def handle_follow_up(message: MessagePayload, background_tasks: Background
     # Use the same dequeue function, which now handles both regular queries and follow-ups
     try:
         result = await dequeue(message, background_tasks)
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
     except HTTPException as http_exc:
         logger.error(f"HTTPException during follow-up dequeue: {http_exc.detail}")
         raise http_exc
@@ -1416,12 +1524,84 @@ async def handle_follow_up(message: MessagePayload, background_tasks: Background
         logger.error(f"Unexpected error in /follow-up endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def _generate_memory_for_conversation(
+    conv_id: int,
+    prompt_template: str,
+    llm_service: LLMService,
+    llm_slots: asyncio.Semaphore,
+) -> None:
+    try:
+        logger.info(f"Processing conversation ID: {conv_id}")
+        history = await api_service.get_conversation_history(conv_id)
+
+        if history is None:
+            logger.warning(f"Could not retrieve history for conversation {conv_id}. Skipping.")
+            return
+
+        if not history:
+            logger.info(f"Conversation {conv_id} has no history. Skipping memory generation.")
+            return
+
+        # 1. Format history for the LLM
+        formatted_history = "\n".join([f"{'User' if msg['is_user'] else 'AI'}: {msg['content']}" for msg in history])
+
+        # 2. Call LLM to generate a structured memory
+        prompt = prompt_template.format(conversation_history=formatted_history)
+
+        # Only the LLM call holds a slot; the history fetch and the memory write to the
+        # backend overlap with other conversations' generations instead of queueing behind them
+        async with llm_slots:
+            response_dict = await llm_service.agenerate_response(
+                prompt,
+                call_type="memory_generation",
+                json_mode=True
+            )
+        summary_json_str = response_dict.get("raw_response")
+
+        if not summary_json_str:
+            logger.error(f"LLM did not return a response for conversation {conv_id}.")
+            return
+
+        # 3. Parse and save the memory
+        try:
+            logger.info(f"[{conv_id}] Raw LLM response: '{summary_json_str}'")
+            # The output might be inside a code block, so we extract it.
+            if "```json" in summary_json_str:
+                logger.info(f"[{conv_id}] JSON markdown detected. Stripping it.")
+                summary_json_str = summary_json_str.split("```json\n")[1].split("\n```")[0]
+                logger.info(f"[{conv_id}] Stripped JSON string: '{summary_json_str}'")
+
+            # Parse and validate in a single pydantic-core pass (no intermediate dict)
+            logger.info(f"[{conv_id}] Attempting to parse and validate JSON with Pydantic model...")
+            validated_data = ConversationMemoryData.model_validate_json(summary_json_str)
+            logger.info(f"[{conv_id}] Successfully validated data.")
+
+            # import ipdb; ipdb.set_trace()
+            # Use the validated data (converted back to a dict) for saving
+            logger.info(f"[{conv_id}] Attempting to save memory...")
+            success = await api_service.save_memory(conv_id, validated_data.model_dump())
+
+            if success:
+                logger.info(f"Successfully generated, validated, and saved memory for conversation {conv_id}.")
+            else:
+                logger.error(f"Failed to save memory for conversation {conv_id} after validation.")
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                logger.error(f"Failed to decode LLM response into JSON for conv {conv_id}. Response: '{summary_json_str}'")
+            else:
+                logger.error(f"Pydantic validation failed for conversation {conv_id}. Errors: {e.json()}. Raw data: {summary_json_str}")
+
+    except Exception as e:
+        logger.error(f"Error processing memory for conversation {conv_id}: {e}", exc_info=True)
+        # Other conversations in the batch carry on even if one fails
+
+
 async def process_memory_generation_batch(conversation_ids: List[int]):
     """
     Processes a batch of conversation IDs to generate and save memories.
     """
     logger.info(f"Starting memory generation batch for {len(conversation_ids)} conversations.")
-    llm_service = LLMService()
+    llm_service = get_llm_service()
 
     # Load the prompt template from the file
     try:
@@ -1432,72 +1612,12 @@ async def process_memory_generation_batch(conversation_ids: List[int]):
         logger.error("Could not find memory_generation_prompt.txt. Aborting batch task.")
         return
 
-    for conv_id in conversation_ids:
-        try:
-            logger.info(f"Processing conversation ID: {conv_id}")
-            history = await api_service.get_conversation_history(conv_id)
-
-            if history is None:
-                logger.warning(f"Could not retrieve history for conversation {conv_id}. Skipping.")
-                continue
-            
-            if not history:
-                logger.info(f"Conversation {conv_id} has no history. Skipping memory generation.")
-                continue
-
-            # 1. Format history for the LLM
-            formatted_history = "\n".join([f"{'User' if msg['is_user'] else 'AI'}: {msg['content']}" for msg in history])
-            
-            # 2. Call LLM to generate a structured memory
-            prompt = prompt_template.format(conversation_history=formatted_history)
-            
-            response_dict = await asyncio.to_thread(
-                llm_service.generate_response,
-                prompt,
-                call_type="memory_generation",
-                json_mode=True
-            )
-            summary_json_str = response_dict.get("raw_response")
-
-            if not summary_json_str:
-                logger.error(f"LLM did not return a response for conversation {conv_id}.")
-                continue
-            
-            # 3. Parse and save the memory
-            try:
-                logger.info(f"[{conv_id}] Raw LLM response: '{summary_json_str}'")
-                # The output might be inside a code block, so we extract it.
-                if "```json" in summary_json_str:
-                    logger.info(f"[{conv_id}] JSON markdown detected. Stripping it.")
-                    summary_json_str = summary_json_str.split("```json\n")[1].split("\n```")[0]
-                    logger.info(f"[{conv_id}] Stripped JSON string: '{summary_json_str}'")
-                
-                logger.info(f"[{conv_id}] Attempting to parse JSON...")
-                summary_data = json.loads(summary_json_str)
-                logger.info(f"[{conv_id}] Successfully parsed JSON.")
-                
-                # Validate the data structure using the Pydantic model
-                logger.info(f"[{conv_id}] Attempting to validate data with Pydantic model...")
-                validated_data = ConversationMemoryData(**summary_data)
-                logger.info(f"[{conv_id}] Successfully validated data.")
-                
-                # import ipdb; ipdb.set_trace()
-                # Use the validated data (converted back to a dict) for saving
-                logger.info(f"[{conv_id}] Attempting to save memory...")
-                success = await api_service.save_memory(conv_id, validated_data.model_dump())
-
-                if success:
-                    logger.info(f"Successfully generated, validated, and saved memory for conversation {conv_id}.")
-                else:
-                    logger.error(f"Failed to save memory for conversation {conv_id} after validation.")
-            except json.JSONDecodeError:
-                logger.error(f"Failed to decode LLM response into JSON for conv {conv_id}. Response: '{summary_json_str}'")
-            except ValidationError as e:
-                logger.error(f"Pydantic validation failed for conversation {conv_id}. Errors: {e.json()}. Raw data: {summary_data}")
-            
-        except Exception as e:
-            logger.error(f"Error processing memory for conversation {conv_id}: {e}", exc_info=True)
-            # Continue to the next conversation even if one fails
+    # Memory generation is one uniform LLM call per conversation; run them concurrently
+    # (bounded, to stay within provider rate limits) instead of one after another.
+    semaphore = asyncio.Semaphore(MEMORY_GENERATION_CONCURRENCY)
+    await asyncio.gather(
+        *(_generate_memory_for_conversation(conv_id, prompt_template, llm_service, semaphore) for conv_id in conversation_ids)
+    )
 
 
 async def process_conversation_evaluation_task(
@@ -1545,7 +1665,7 @@ async def process_conversation_evaluation_task(
 
         global EVALUATION_LLM_SERVICE
         if EVALUATION_LLM_SERVICE is None:
-            EVALUATION_LLM_SERVICE = LLMService()
+            EVALUATION_LLM_SERVICE = get_llm_service()
 
         loop = asyncio.get_running_loop()
         def _generate_with_logging(service: LLMService, prompt: str, call_type: str, json_mode: bool):
@@ -1631,7 +1751,7 @@ async def process_class_analysis_task(
         
         # 3. Format prompt and call LLM
         formatted_prompt = prompt_template.replace("{{ALL_CONVERSATIONS}}", transcript)
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         messages = [{"role": "user", "content": formatted_prompt}]
         analysis_text = llm_service.get_completion(messages=messages, call_type="class_analysis", json_mode=False)
         
@@ -1695,7 +1815,7 @@ async def process_student_analysis_task(
         
         # 3. Format prompt and call LLM
         formatted_prompt = prompt_template.replace("{{ALL_CONVERSATIONS}}", transcript)
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         messages = [{"role": "user", "content": formatted_prompt}]
         analysis_text = llm_service.get_completion(messages=messages, call_type="student_analysis", json_mode=False)
         
@@ -1813,7 +1933,8 @@ async def analyze_class_conversations(request: ClassAnalysisRequest):
     """
     logger.info(f"Received class analysis request with call_type: {request.call_type}")
     
-    if not request.all_conversations or not request.all_conversations.strip():
+    # isspace() checks for blank text without strip() copying the (multi-MB) transcript
+    if not request.all_conversations or request.all_conversations.isspace():
         raise HTTPException(status_code=400, detail="all_conversations is required and cannot be empty")
     
     try:
@@ -1830,7 +1951,7 @@ async def analyze_class_conversations(request: ClassAnalysisRequest):
         formatted_prompt = prompt_template.replace("{{ALL_CONVERSATIONS}}", request.all_conversations)
         
         # Initialize LLM service
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         
         # Prepare messages for the LLM
         messages = [
@@ -1882,7 +2003,8 @@ async def analyze_student_conversations(request: StudentAnalysisRequest):
     """
     logger.info(f"Received student analysis request with call_type: {request.call_type}")
     
-    if not request.all_conversations or not request.all_conversations.strip():
+    # isspace() checks for blank text without strip() copying the (multi-MB) transcript
+    if not request.all_conversations or request.all_conversations.isspace():
         raise HTTPException(status_code=400, detail="all_conversations is required and cannot be empty")
     
     try:
@@ -1899,7 +2021,7 @@ async def analyze_student_conversations(request: StudentAnalysisRequest):
         formatted_prompt = prompt_template.replace("{{ALL_CONVERSATIONS}}", request.all_conversations)
         
         # Initialize LLM service
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         
         # Prepare messages for the LLM
         messages = [
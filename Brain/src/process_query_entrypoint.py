@@ -1,16 +1,38 @@
 from src.utils.logger import logger
+import asyncio
 import os
 from typing import Optional, Dict, Any, List, Tuple
 from src.config_models import FlowConfig
-from src.schemas import ProcessQueryResponse
-import httpx
+from src.schemas import ProcessQueryResponse, SimplifiedConversationStepData
 from src.core.turn_context import PromptExecutionContext
 from src.services.api_service import api_service
-from src.utils.prompt_injection import inject_core_theme_placeholder
+from src.services.llm_service import get_llm_service
+from src.utils.prompt_injection import get_prompt_placeholder_families, render_prompt_placeholders
 
 # Always use simplified conversation mode
 FORCE_SIMPLIFIED_MODE = True
 
+# Shared, byte-identical system message so every turn sends the same prompt prefix,
+# which lets the provider's prefix (KV) cache reuse its prefill across calls.
+SIMPLIFIED_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a Curiosity Coach, designed to engage students in thought-provoking conversations that foster critical thinking and curiosity.",
+}
+NO_CONVERSATION_HISTORY_TEXT = "No previous conversation."
+
+# The step's "prompt" field predates "formatted_prompt" and repeats it verbatim; set
+# INCLUDE_LEGACY_PROMPT_KEY=true for consumers that still read it
+INCLUDE_LEGACY_PROMPT_KEY = os.getenv("INCLUDE_LEGACY_PROMPT_KEY", "false").lower() == "true"
+
+# Used whenever no FlowConfig is passed in; its dump is computed once and reused
+_DEFAULT_FLOW_CONFIG = FlowConfig()
+
+# Curiosity scores are clamped to 0-100, so their prompt text is precomputed
+_CURIOSITY_SCORE_STRS = tuple(str(score) for score in range(101))
+
+# Local fallback templates ship with the image and never change within a process
+_local_prompt_cache: Dict[str, str] = {}
+
 
 def prompt_template_requires_conversation_memory(prompt_template: str) -> bool:
     return "{{CONVERSATION_MEMORY" in prompt_template
@@ -31,8 +53,8 @@ async def resolve_prompt_execution_context(
     """
     Resolve the prompt template and stable metadata for the current turn.
     """
-    logger.info(
-        f"Resolving prompt execution context (purpose={purpose}, conversation_id={conversation_id})"
+    logger.debug(
+        "Resolving prompt execution context (purpose=%s, conversation_id=%s)", purpose, conversation_id
     )
 
     prompt_file_path = os.path.join(os.path.dirname(__file__), "prompts", "simplified_conversation_prompt.txt")
@@ -53,16 +75,20 @@ async def resolve_prompt_execution_context(
                 elif prompt_version_used is not None:
                     prompt_name_used = f"conversation_prompt_v{prompt_version_used}"
                 logger.info(
-                    "Using conversation-assigned prompt "
-                    f"(name={prompt_name_used}, version={prompt_version_used}, purpose={prompt_purpose})"
+                    "Using conversation-assigned prompt (name=%s, version=%s, purpose=%s)",
+                    prompt_name_used,
+                    prompt_version_used,
+                    prompt_purpose,
                 )
             else:
                 logger.warning(
-                    f"Prompt response missing prompt_text for conversation_id={conversation_id}; using fallback"
+                    "Prompt response missing prompt_text for conversation_id=%s; using fallback", conversation_id
                 )
         except Exception as exc:
             logger.error(
-                f"Could not fetch assigned prompt for conversation_id={conversation_id}: {exc}",
+                "Could not fetch assigned prompt for conversation_id=%s: %s",
+                conversation_id,
+                exc,
                 exc_info=True,
             )
 
@@ -77,6 +103,73 @@ async def resolve_prompt_execution_context(
         prompt_purpose=prompt_purpose,
     )
 
+
+async def _build_simplified_prompt(
+    query: str,
+    conversation_history: Optional[str],
+    user_persona: Optional[Dict[str, Any]],
+    purpose: str,
+    conversation_memory: Optional[Dict[str, Any]],
+    conversation_id: Optional[int],
+    user_id: Optional[int],
+    current_curiosity_score: int,
+    prompt_context: Optional[PromptExecutionContext],
+    core_theme: Optional[str],
+    previous_memories: Optional[List[Dict[str, Any]]],
+) -> Tuple[str, str, str, Optional[int]]:
+    """
+    Resolve the prompt template for this turn and fill in all of its placeholders.
+
+    Returns:
+        Tuple[str, str, str, Optional[int]]: The prompt template (with placeholders), the formatted prompt, the prompt name used, and the prompt version number
+    """
+    effective_prompt_context = prompt_context or await resolve_prompt_execution_context(
+        purpose=purpose,
+        conversation_id=conversation_id,
+    )
+    prompt_template = effective_prompt_context.prompt_template
+    prompt_name_used = effective_prompt_context.prompt_name
+    prompt_version_used = effective_prompt_context.prompt_version
+
+    # Format the prompt with query and conversation history
+    logger.debug(
+        "Formatting prompt with query length=%d and history length=%d",
+        len(query),
+        len(conversation_history) if conversation_history else 0,
+    )
+    # The raw template is what gets compiled (and cached), so the per-turn score stays a value
+    raw_prompt_template = prompt_template
+    placeholders = get_prompt_placeholder_families(raw_prompt_template)
+    curiosity_score_str = _CURIOSITY_SCORE_STRS[max(0, min(100, current_curiosity_score))]
+    prompt_template = prompt_template.replace("{{CURRENT_CURIOSITY_SCORE}}", curiosity_score_str)
+
+    # Previous memories are only fetched here for visit-based prompts that use them
+    # (including nested keys) and when the caller didn't prefetch them
+    resolved_previous_memories = previous_memories
+    if "PREVIOUS_CONVERSATIONS_MEMORY" in placeholders and resolved_previous_memories is None and user_id and conversation_id:
+        try:
+            resolved_previous_memories = await api_service.get_previous_memories(user_id, conversation_id)
+            logger.debug("Fetched %d previous memories for user %s", len(resolved_previous_memories), user_id)
+        except Exception as e:
+            logger.warning("Could not fetch previous memories: %s", e)
+
+    # Substitute query, history, memories, persona and core theme in a single pass
+    formatted_prompt = render_prompt_placeholders(
+        raw_prompt_template,
+        {
+            "CURRENT_CURIOSITY_SCORE": curiosity_score_str,
+            "QUERY": query,
+            "CONVERSATION_HISTORY": conversation_history or NO_CONVERSATION_HISTORY_TEXT,
+        },
+        conversation_memory=conversation_memory,
+        user_persona=user_persona,
+        previous_memories=resolved_previous_memories,
+        core_theme=core_theme,
+    )
+
+    return prompt_template, formatted_prompt, prompt_name_used, prompt_version_used
+
+
 async def generate_simplified_response(
     query: str,
     conversation_history: Optional[str] = None,
@@ -106,75 +199,39 @@ async def generate_simplified_response(
     Returns:
         Tuple[str, str, str, Dict[str, Any], str, Optional[int]]: The response, the prompt template (with placeholders), the formatted prompt (sent to LLM), the full structured response data, the prompt name used, and the prompt version number
     """
-    logger.info(f"Generating simplified response for query: {query} (purpose: {purpose}, conversation_id: {conversation_id})")
+    logger.debug("Generating simplified response for query: %s (purpose: %s, conversation_id: %s)", query, purpose, conversation_id)
     
     try:
-        effective_prompt_context = prompt_context or await resolve_prompt_execution_context(
-            purpose=purpose,
-            conversation_id=conversation_id,
+        prompt_template, formatted_prompt, prompt_name_used, prompt_version_used = await _build_simplified_prompt(
+            query,
+            conversation_history,
+            user_persona,
+            purpose,
+            conversation_memory,
+            conversation_id,
+            user_id,
+            current_curiosity_score,
+            prompt_context,
+            core_theme,
+            previous_memories,
         )
-        prompt_template = effective_prompt_context.prompt_template
-        prompt_name_used = effective_prompt_context.prompt_name
-        prompt_version_used = effective_prompt_context.prompt_version
-
-        # Format the prompt with query and conversation history
-        logger.info(
-            f"Formatting prompt with query length={len(query)} and "
-            f"history length={len(conversation_history) if conversation_history else 0}"
-        )
-        curiosity_score_str = str(max(0, min(100, current_curiosity_score)))
-        prompt_template = prompt_template.replace("{{CURRENT_CURIOSITY_SCORE}}", curiosity_score_str)
-
-        formatted_prompt = prompt_template.replace("{{QUERY}}", query)
-        
-        if conversation_history:
-            formatted_prompt = formatted_prompt.replace("{{CONVERSATION_HISTORY}}", conversation_history)
-        else:
-            formatted_prompt = formatted_prompt.replace("{{CONVERSATION_HISTORY}}", "No previous conversation.")
-        
-        # Inject previous memories placeholder (for visit-based prompts)
-        # Check for any variant of PREVIOUS_CONVERSATIONS_MEMORY placeholder (including nested keys)
-        if "{{PREVIOUS_CONVERSATIONS_MEMORY" in formatted_prompt:
-            from src.utils.prompt_injection import inject_previous_memories_placeholder
-            resolved_previous_memories = previous_memories
-            if resolved_previous_memories is None and user_id and conversation_id:
-                try:
-                    resolved_previous_memories = await api_service.get_previous_memories(user_id, conversation_id)
-                    logger.info(f"Fetched {len(resolved_previous_memories)} previous memories for user {user_id}")
-                except Exception as e:
-                    logger.warning(f"Could not fetch previous memories: {e}")
-            formatted_prompt = inject_previous_memories_placeholder(formatted_prompt, resolved_previous_memories)
-        
-        # Inject persona placeholders (supports {{USER_PERSONA}} and key-specific variants)
-        if "{{USER_PERSONA" in formatted_prompt:
-            from src.utils.prompt_injection import inject_persona_placeholders
-            formatted_prompt = inject_persona_placeholders(formatted_prompt, user_persona)
-
-        # Inject core theme placeholder (for visit-based prompts)
-        if "{{CORE_THEME" in formatted_prompt:
-            formatted_prompt = inject_core_theme_placeholder(formatted_prompt, core_theme)
-        
-        # Inject conversation memory placeholders if present
-        if "{{CONVERSATION_MEMORY" in formatted_prompt:
-            from src.utils.prompt_injection import inject_memory_placeholders
-            formatted_prompt = inject_memory_placeholders(formatted_prompt, conversation_memory)
 
         # Call LLM service
-        from src.services.llm_service import LLMService
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         
         messages = [
-            {"role": "system", "content": "You are a Curiosity Coach, designed to engage students in thought-provoking conversations that foster critical thinking and curiosity."},
+            SIMPLIFIED_SYSTEM_MESSAGE,
             {"role": "user", "content": formatted_prompt}
         ]
         
-        response_text = llm_service.get_completion(messages, call_type="simplified_conversation")
+        # Use the async SDK client so concurrent work (e.g. core theme extraction for the same
+        # turn, or other conversations) proceeds while the completion is in flight.
+        response_text = await llm_service.aget_completion(messages, call_type="simplified_conversation")
         return (
             response_text,
             prompt_template,
             formatted_prompt,
             {
-                "response": response_text,
                 "needs_clarification": False,
                 "follow_up_questions": [],
             },
@@ -183,7 +240,7 @@ async def generate_simplified_response(
         )
 
     except Exception as e:
-        logger.error(f"Error in generate_simplified_response: {str(e)}", exc_info=True)
+        logger.error("Error in generate_simplified_response: %s", e, exc_info=True)
         raise
 
 async def _get_prompt_template(filepath: str, prompt_name: str, purpose: str = "chat") -> str:
@@ -203,31 +260,46 @@ async def _get_prompt_template(filepath: str, prompt_name: str, purpose: str = "
     """
     try:
         # First, try to get from the backend (asynchronously)
-        logger.info(f"Attempting to fetch '{prompt_name}' prompt from backend versioning system (purpose: {purpose})")
+        logger.debug("Attempting to fetch '%s' prompt from backend versioning system (purpose: %s)", prompt_name, purpose)
         prompt_text = await _get_prompt_from_backend(prompt_name, purpose)
         
         if prompt_text:
-            logger.info(f"Using versioned prompt '{prompt_name}' from backend (purpose: {purpose})")
+            logger.debug("Using versioned prompt '%s' from backend (purpose: %s)", prompt_name, purpose)
             return prompt_text
         
         # Fallback to local file
-        logger.info(f"Falling back to local prompt template: {filepath}")
-        with open(filepath, "r") as f:
-            prompt_template = f.read()
-            
-        logger.info(f"Successfully loaded local prompt template: {filepath}")
+        logger.info("Falling back to local prompt template: %s", filepath)
+        prompt_template = await _read_local_prompt_template(filepath)
+        logger.debug("Successfully loaded local prompt template: %s", filepath)
         return prompt_template
     except FileNotFoundError:
-        logger.error(f"Local prompt template file not found: {filepath}")
+        logger.error("Local prompt template file not found: %s", filepath)
         raise Exception(f"Local prompt template file not found: {filepath}")
     except Exception as e:
-        logger.error(f"Failed to get prompt template: {e}", exc_info=True)
+        logger.error("Failed to get prompt template: %s", e, exc_info=True)
         raise Exception(f"Failed to get prompt template: {e}")
 
+def _read_file(filepath: str) -> str:
+    with open(filepath, "r") as f:
+        return f.read()
+
+
+async def _read_local_prompt_template(filepath: str) -> str:
+    """Read a bundled prompt file once, off the event loop, and serve it from memory afterwards."""
+    prompt_template = _local_prompt_cache.get(filepath)
+    if prompt_template is None:
+        prompt_template = await asyncio.to_thread(_read_file, filepath)
+        _local_prompt_cache[filepath] = prompt_template
+    return prompt_template
+
 async def _get_prompt_from_backend(prompt_name: str, purpose: str = "chat") -> Optional[str]:
     """
     Attempts to retrieve the prompt version template from the backend versioning system.
     
+    Production prompts (purpose "chat") are served from APIService's prompt cache. Other
+    purposes (e.g. test-prompt) read the active version, which is being edited, so they
+    always go to the backend.
+    
     Args:
         prompt_name (str): The name of the prompt to retrieve
         purpose (str): The purpose/endpoint ("chat" uses production, others use active)
@@ -235,40 +307,113 @@ async def _get_prompt_from_backend(prompt_name: str, purpose: str = "chat") -> O
     Returns:
         Optional[str]: The prompt template text if found, None otherwise
     """
-    try:
-        # Get backend URL from environment
-        backend_url = os.getenv("BACKEND_CALLBACK_BASE_URL", "http://localhost:5000")
-        
-        # Build the appropriate URL based on purpose
-        if purpose == "chat":
-            # For chat endpoint, use production version
-            version_url = f"{backend_url}/api/prompts/{prompt_name}/versions/production"
-        else:
-            # For test-prompt and others, use active version
-            version_url = f"{backend_url}/api/prompts/{prompt_name}/versions/active"
-            
-        logger.debug(f"Fetching prompt version from: {version_url} (purpose: {purpose})")
-        
-        # Make the request
-        async with httpx.AsyncClient() as client:
-            response = await client.get(version_url, timeout=5.0)
-            
-            if response.status_code == 200:
-                data = response.json()
-                prompt_text = data.get("prompt_text")
-                version_id = data.get("id")
-                version_number = data.get("version_number")
-                is_production = data.get("is_production", False)
-                version_type = "production" if purpose == "chat" else "active"
-                logger.info(f"Retrieved {version_type} version {version_number} (ID: {version_id}, production: {is_production}) for prompt '{prompt_name}' (purpose: {purpose})")
-                return prompt_text
-                
-            logger.warning(f"Failed to get prompt version from backend: Status {response.status_code}")
-            return None
-            
-    except Exception as e:
-        logger.warning(f"Error getting prompt version from backend: {e}")
-        return None
+    if purpose == "chat":
+        return await api_service.get_prompt_template(prompt_name)
+    return await api_service.get_prompt_template(prompt_name, prefer_production=False, use_cache=False)
+
+def _package_simplified_response(
+    query: str,
+    config_dump: Dict[str, Any],
+    current_curiosity_score: int,
+    response: str,
+    prompt_template: str,
+    formatted_prompt: str,
+    response_data: Dict[str, Any],
+    prompt_name_used: str,
+    prompt_version_used: Optional[int],
+) -> ProcessQueryResponse:
+    """Wrap a generated simplified conversation turn in a ProcessQueryResponse."""
+    # Check if we need clarification
+    needs_clarification = response_data.get("needs_clarification", False)
+
+    # Always use 'simplified_conversation' as step name for schema validation.
+    # Track the actual prompt used separately for debugging/tracking.
+    # Built directly as the typed step model, so the response passes the instance through
+    # without re-validating it against the step union. Plain construction is used rather
+    # than model_construct(): pydantic-core's validator is faster than its pure-Python path.
+    simplified_step_data = SimplifiedConversationStepData(
+        name='simplified_conversation',  # Must match schema expectations
+        enabled=True,
+        prompt_template=prompt_template,  # Original template with placeholders
+        formatted_prompt=formatted_prompt,  # What actually went to the LLM
+        prompt=formatted_prompt if INCLUDE_LEGACY_PROMPT_KEY else None,  # Legacy duplicate of formatted_prompt
+        result=response,
+        response_data=response_data,
+        needs_clarification=needs_clarification,
+        prompt_name=prompt_name_used,  # Track actual prompt purpose (visit_1, visit_2, etc.)
+        prompt_version=prompt_version_used  # Include version for debugging
+    )
+
+    return ProcessQueryResponse(
+        query=query,
+        config_used=config_dump,
+        steps=[simplified_step_data],
+        final_response=response,
+        # Follow-up questions are only surfaced when the model asks for clarification
+        follow_up_questions=response_data.get("follow_up_questions", []) if needs_clarification else None,
+        needs_clarification=bool(needs_clarification),
+        current_curiosity_score=current_curiosity_score,
+    )
+
+
+def _resolve_flow_config(config: Optional[FlowConfig], context: str = "") -> Tuple[FlowConfig, Dict[str, Any]]:
+    """Return the effective FlowConfig and its dump, computed once for logging and the response payload."""
+    effective_config = config if config is not None else _DEFAULT_FLOW_CONFIG
+    config_dump = effective_config.config_dump
+    if config is None:
+        logger.info("No configuration provided%s, using default FlowConfig.", context)
+    else:
+        logger.info("Using provided configuration%s: %s", context, config_dump)
+    return effective_config, config_dump
+
+
+async def _run_simplified_conversation(
+    query: str,
+    conversation_history: Optional[str],
+    *,
+    config_dump: Dict[str, Any],
+    user_persona: Optional[Dict[str, Any]] = None,
+    purpose: str = "chat",
+    conversation_memory: Optional[Dict[str, Any]] = None,
+    conversation_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    current_curiosity_score: int = 0,
+    prompt_context: Optional[PromptExecutionContext] = None,
+    core_theme: Optional[str] = None,
+    previous_memories: Optional[List[Dict[str, Any]]] = None,
+) -> ProcessQueryResponse:
+    """
+    Run the simplified conversation step and package it as a ProcessQueryResponse.
+
+    Shared by process_query and process_follow_up so both entrypoints build the
+    pipeline payload the same way.
+    """
+    # Generate simplified response
+    response, prompt_template, formatted_prompt, response_data, prompt_name_used, prompt_version_used = await generate_simplified_response(
+        query,
+        conversation_history,
+        user_persona,
+        purpose,
+        conversation_memory,
+        conversation_id,
+        user_id,
+        current_curiosity_score=current_curiosity_score,
+        prompt_context=prompt_context,
+        core_theme=core_theme,
+        previous_memories=previous_memories,
+    )
+
+    return _package_simplified_response(
+        query,
+        config_dump,
+        current_curiosity_score,
+        response,
+        prompt_template,
+        formatted_prompt,
+        response_data,
+        prompt_name_used,
+        prompt_version_used,
+    )
 
 async def process_query(
     query: str,
@@ -306,75 +451,32 @@ async def process_query(
     """
 
     try:
-        logger.info(f"Processing query: {query}")
-        
-        effective_config = config if config is not None else FlowConfig()
-        if config is None:
-            logger.info("No configuration provided, using default FlowConfig.")
-        else:
-            logger.info(f"Using provided configuration: {effective_config.model_dump()}")
-
-        pipeline_data = {
-            'query': query,
-            'config_used': effective_config.model_dump(),
-            'steps': [],
-            'final_response': None,
-            'follow_up_questions': None,
-            'needs_clarification': False,
-            'current_curiosity_score': current_curiosity_score,
-        }
+        logger.info("Processing query: %s", query)
         
+        effective_config, config_dump = _resolve_flow_config(config)
+
         # Check if simplified mode is enabled (either by config or force flag)
         is_simplified_mode = FORCE_SIMPLIFIED_MODE or effective_config.use_simplified_mode
         
         if is_simplified_mode:
-            logger.info("Using simplified conversation mode")
-            
-            # Generate simplified response
-            response, prompt_template, formatted_prompt, response_data, prompt_name_used, prompt_version_used = await generate_simplified_response(
+            logger.debug("Using simplified conversation mode")
+            return await _run_simplified_conversation(
                 query,
                 conversation_history,
-                user_persona,
-                purpose,
-                conversation_memory,
-                conversation_id,
-                user_id,
+                config_dump=config_dump,
+                user_persona=user_persona,
+                purpose=purpose,
+                conversation_memory=conversation_memory,
+                conversation_id=conversation_id,
+                user_id=user_id,
                 current_curiosity_score=current_curiosity_score,
                 prompt_context=prompt_context,
                 core_theme=core_theme,
                 previous_memories=previous_memories,
             )
             
-            # Check if we need clarification
-            needs_clarification = response_data.get("needs_clarification", False)
-            
-            # Update pipeline data with follow-up questions if needed
-            if needs_clarification:
-                pipeline_data['needs_clarification'] = True
-                pipeline_data['follow_up_questions'] = response_data.get("follow_up_questions", [])
-                # No need for partial_understanding in simplified mode
-            
-            # Update pipeline data - always use 'simplified_conversation' as step name for schema validation
-            # Track the actual prompt used separately for debugging/tracking
-            simplified_step_data = {
-                'name': 'simplified_conversation',  # Must match schema expectations
-                'enabled': True,
-                'prompt_template': prompt_template,  # Original template with placeholders
-                'formatted_prompt': formatted_prompt,  # What actually went to the LLM
-                'prompt': formatted_prompt,  # Keep for backwards compatibility
-                'result': response,
-                'response_data': response_data,
-                'needs_clarification': needs_clarification,
-                'prompt_name': prompt_name_used,  # Track actual prompt purpose (visit_1, visit_2, etc.)
-                'prompt_version': prompt_version_used  # Include version for debugging
-            }
-            pipeline_data['steps'].append(simplified_step_data)
-            pipeline_data['final_response'] = response
-            
-            return ProcessQueryResponse(**pipeline_data)
-            
     except Exception as e:
-        logger.error(f"Error in process_query: {str(e)}", exc_info=True)
+        logger.error("Error in process_query: %s", e, exc_info=True)
         raise
 
 async def process_follow_up(
@@ -415,78 +517,42 @@ async def process_follow_up(
         Exception: If any part of the pipeline fails
     """
     try:
-        logger.info(f"Processing follow-up. Original query: '{original_query}', Student response: '{student_response}' (purpose: {purpose})")
-        
-        effective_config = config if config is not None else FlowConfig()
-        if config is None:
-            logger.info("No configuration provided for follow-up processing, using default FlowConfig.")
-        else:
-            logger.info(f"Using provided configuration for follow-up processing: {effective_config.model_dump()}")
-
-        # Initialize pipeline data structure
-        pipeline_data = {
-            'query': student_response,
-            'config_used': effective_config.model_dump(),
-            'steps': [],
-            'final_response': None,
-            'current_curiosity_score': current_curiosity_score,
-        }
+        logger.info(
+            "Processing follow-up. Original query: '%s', Student response: '%s' (purpose: %s)",
+            original_query, student_response, purpose,
+        )
         
+        effective_config, config_dump = _resolve_flow_config(config, " for follow-up processing")
+
         # Check if simplified mode is enabled (by config or force flag)
         is_simplified_mode = FORCE_SIMPLIFIED_MODE or effective_config.use_simplified_mode
         
         if is_simplified_mode:
-            logger.info("Using simplified conversation mode for follow-up")
+            logger.debug("Using simplified conversation mode for follow-up")
             
             # Create conversation history with original query and response
-            enhanced_conversation_history = ""
-            if conversation_history:
-                enhanced_conversation_history = conversation_history
-            else:
-                enhanced_conversation_history = f"User: {original_query}\nAI: {', '.join(follow_up_questions)}\nUser: {student_response}"
+            enhanced_conversation_history = conversation_history or "\n".join((
+                "User: " + original_query,
+                "AI: " + ", ".join(follow_up_questions),
+                "User: " + student_response,
+            ))
             
-            # Generate simplified response
-            response, prompt_template, formatted_prompt, response_data, prompt_name_used, prompt_version_used = await generate_simplified_response(
+            return await _run_simplified_conversation(
                 student_response,
                 enhanced_conversation_history,
-                user_persona,
-                purpose,
-                conversation_memory,
-                conversation_id,
-                user_id,
+                config_dump=config_dump,
+                user_persona=user_persona,
+                purpose=purpose,
+                conversation_memory=conversation_memory,
+                conversation_id=conversation_id,
+                user_id=user_id,
                 current_curiosity_score=current_curiosity_score,
                 prompt_context=prompt_context,
                 core_theme=core_theme,
                 previous_memories=previous_memories,
             )
-            
-            # Check if we need clarification (again)
-            needs_clarification = response_data.get("needs_clarification", False)
-            
-            # Update pipeline data with follow-up questions if needed
-            if needs_clarification:
-                pipeline_data['needs_clarification'] = True
-                pipeline_data['follow_up_questions'] = response_data.get("follow_up_questions", [])
-            
-            # Update pipeline data - always use 'simplified_conversation' as step name for schema validation
-            # Track the actual prompt used separately for debugging/tracking
-            simplified_step_data = {
-                'name': 'simplified_conversation',  # Must match schema expectations
-                'enabled': True,
-                'prompt_template': prompt_template,  # Original template with placeholders
-                'formatted_prompt': formatted_prompt,  # What actually went to the LLM
-                'prompt': formatted_prompt,  # Keep for backwards compatibility
-                'result': response,
-                'response_data': response_data,
-                'needs_clarification': needs_clarification,
-                'prompt_name': prompt_name_used,  # Track actual prompt purpose (visit_1, visit_2, etc.)
-                'prompt_version': prompt_version_used  # Include version for debugging
-            }
-            pipeline_data['steps'].append(simplified_step_data)
-            pipeline_data['final_response'] = response
-            
-            return ProcessQueryResponse(**pipeline_data)
 
     except Exception as e:
-        logger.error(f"Error in process_follow_up: {str(e)}", exc_info=True)
+        logger.error("Error in process_follow_up: %s", e, exc_info=True)
         raise
+
@@ -1,5 +1,5 @@
-from typing import Optional, Dict, Any, List, Union, Literal
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional, Dict, Any, List, Union, Literal
+from pydantic import BaseModel, ConfigDict, Discriminator, Field, SkipValidation, Tag
 
 # Pydantic models for process_query response
 class PipelineStepBase(BaseModel):
@@ -10,7 +10,8 @@ class PipelineStepBase(BaseModel):
     prompt_template: Optional[str] = None
     formatted_prompt: Optional[str] = None
     result: Optional[Any] = None
-    response_data: Optional[Dict[str, Any]] = None
+    # Produced by the pipeline and only ever serialized, so the dict check is skipped.
+    response_data: Optional[SkipValidation[Dict[str, Any]]] = None
     step_id: Optional[str] = None
     step_kind: Optional[str] = None
 
@@ -35,24 +36,27 @@ class GenericPipelineStepData(PipelineStepBase):
     name: str
 
 
-PipelineStepData = Union[
-    SimplifiedConversationStepData,
-    CuriosityScoreEvaluationStepData,
-    GenericPipelineStepData,
-]
+_TYPED_STEP_NAMES = frozenset({"simplified_conversation", "curiosity_score_evaluation"})
 
-class PipelineData(BaseModel):
-    query: str
-    config_used: Dict[str, Any] 
-    steps: List[PipelineStepData]
-    final_response: Optional[str] = None
-    follow_up_questions: Optional[List[str]] = None
-    needs_clarification: bool = False
-    partial_understanding: Optional[str] = None
+
+def _pipeline_step_tag(step: Any) -> str:
+    """Pick the step model from its name so validation doesn't try every union member."""
+    name = step.get("name") if isinstance(step, dict) else getattr(step, "name", None)
+    return name if name in _TYPED_STEP_NAMES else "generic"
+
+
+PipelineStepData = Annotated[
+    Union[
+        Annotated[SimplifiedConversationStepData, Tag("simplified_conversation")],
+        Annotated[CuriosityScoreEvaluationStepData, Tag("curiosity_score_evaluation")],
+        Annotated[GenericPipelineStepData, Tag("generic")],
+    ],
+    Discriminator(_pipeline_step_tag),
+]
 
 class ProcessQueryResponse(BaseModel):
     query: str = Field(..., description="The original query that was processed")
-    config_used: Dict[str, Any] = Field(..., description="Configuration used during processing")
+    config_used: SkipValidation[Dict[str, Any]] = Field(..., description="Configuration used during processing")
     steps: List[PipelineStepData] = Field(..., description="Pipeline steps that were executed")
     final_response: Optional[str] = Field(None, description="The final response or follow-up questions")
     follow_up_questions: Optional[List[str]] = Field(None, description="List of follow-up questions if clarification is needed")
@@ -62,48 +66,66 @@ class ProcessQueryResponse(BaseModel):
     curiosity_score: Optional[int] = Field(None, description="Curiosity score generated for this response")
 # --- Conversation Memory Schemas ---
 
+# The structured memory sub-models document the LLM output shape and are never mutated;
+# deferring their schema build keeps it off the import path until one is validated.
+_MEMORY_LEAF_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore", defer_build=True)
+
 class BoosterAttempted(BaseModel):
     category: str = Field(..., description="Name of the curiosity booster category")
     ai_evidence: str = Field(..., description="Quote from AI demonstrating the technique")
     kid_reception: str = Field(..., description="How the kid received it: strong / weak / not received")
     kid_evidence: str = Field(..., description="Quote from kid showing their response")
 
+    model_config = _MEMORY_LEAF_MODEL_CONFIG
+
 class CuriosityBoosters(BaseModel):
     boosters_attempted: List[BoosterAttempted] = Field(..., description="List of curiosity boosters the AI tried")
     not_attempted: List[str] = Field(..., description="List of categories not found in AI responses")
     comment: str = Field(..., description="Short summary of which strategies resonated most")
 
+    model_config = _MEMORY_LEAF_MODEL_CONFIG
+
 class InvitationToComeback(BaseModel):
     inviting_to_come_back: bool = Field(..., description="Whether the ending encourages the kid to return")
     category: str = Field(..., description="Type: cliffhanger / mini_challenge / kid_choice / none")
     evidence: str = Field(..., description="Exact quote from chat if found, else empty")
     comment: str = Field(..., description="Short explanation")
 
+    model_config = _MEMORY_LEAF_MODEL_CONFIG
+
 class KnowledgeJourney(BaseModel):
     initial_knowledge: Dict[str, str] = Field(..., description="Kid's starting knowledge by topic")
     ai_contributions: Dict[str, str] = Field(..., description="New knowledge added by AI by topic")
     missing_for_holistic_picture: Dict[str, Any] = Field(..., description="What's still missing for holistic understanding")
 
+    model_config = _MEMORY_LEAF_MODEL_CONFIG
+
 class LearningProfileAssessment(BaseModel):
     assessment: str = Field(..., description="Assessment value")
     evidence: str = Field(..., description="Quote supporting the assessment")
     comment: str = Field(..., description="Short explanation")
 
+    model_config = _MEMORY_LEAF_MODEL_CONFIG
+
 class KidLearningProfile(BaseModel):
     attention_span: LearningProfileAssessment = Field(..., description="Assessment of attention span")
     ability_to_grasp: LearningProfileAssessment = Field(..., description="Assessment of comprehension ability")
     processing_time: LearningProfileAssessment = Field(..., description="Assessment of processing speed")
     engagement_patterns: LearningProfileAssessment = Field(..., description="Assessment of engagement style")
 
+    model_config = _MEMORY_LEAF_MODEL_CONFIG
+
 class ConversationMemoryData(BaseModel):
+    # The sections stay plain dicts rather than the models above: the memory prompt is
+    # iterated on independently (e.g. engagement_patterns reports "style", not "assessment"),
+    # and whatever keys the LLM returns are saved verbatim via model_dump().
     curiosity_boosters: Dict[str, Any] = Field(..., description="Analysis of curiosity-building techniques")
     invitation_to_come_back: Dict[str, Any] = Field(..., description="Analysis of re-engagement strategies")
     knowledge_journey: Dict[str, Any] = Field(..., description="Analysis of learning progression")
     kid_learning_profile: Dict[str, Any] = Field(..., description="Assessment of kid's learning characteristics")
-    
-    class Config:
-        # Allow any extra fields for flexibility during testing
-        extra = "allow"
+
+    # Allow any extra fields for flexibility during testing
+    model_config = {"extra": "allow"}
     
 
 
@@ -112,14 +134,7 @@ class ConversationMemoryData(BaseModel):
 # Validates that persona_data is a valid dict, but doesn't enforce specific keys
 class UserPersonaData(BaseModel):
     # Accept any key-value pairs for flexible prompt iteration
-    class Config:
-        extra = "allow"
-    
-    # Override __init__ to accept arbitrary dict structure
-    def __init__(self, **data):
-        # Just validate it's a dict with string values (most common case)
-        # But allow any structure for flexibility during prompt experiments
-        super().__init__(**data)
+    model_config = {"extra": "allow"}
 
 
 # --- Opening Message Request Schema ---
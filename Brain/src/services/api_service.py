@@ -1,175 +1,377 @@
+import asyncio
 import httpx
 import os
+import random
 import time
-from typing import Dict, Any, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from pydantic_core import from_json, to_json
+from src.services.http_client import (
+    BACKEND_REQUEST_TIMEOUT,
+    BackendUnavailableError,
+    backend_get,
+    budgeted_timeout,
+    get_http_client,
+)
 from src.utils.logger import logger
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _parse_json(response: httpx.Response) -> Any:
+    """Decode a JSON response body with pydantic-core's parser, which is faster than json.loads."""
+    return from_json(response.content)
+
+
+def _json_request_kwargs(payload: Any) -> Dict[str, Any]:
+    """Encode a request body with pydantic-core instead of httpx's stdlib json.dumps."""
+    return {"content": to_json(payload), "headers": _JSON_HEADERS}
+
+
+# GETs are idempotent, so connection drops, timeouts and gateway/overload answers are retried in
+# place instead of failing the whole turn; writes are never retried. A plain 500 is treated as
+# a backend bug and not retried.
+_GET_RETRIES = int(os.getenv("BACKEND_GET_RETRIES", "2"))
+_RETRY_MAX_DELAY_SECONDS = float(os.getenv("BACKEND_RETRY_MAX_DELAY_SECONDS", "1.0"))
+_RETRYABLE_REQUEST_ERRORS = (httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError)
+_RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+# Transcripts are assembled on demand by the backend and can take a while
+_TRANSCRIPT_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+# Prompt lookups sit on the turn's critical path, so they give up sooner
+_PROMPT_TIMEOUT = httpx.Timeout(10.0)
+_ANALYTICS_TIMEOUT = httpx.Timeout(20.0, connect=10.0)
+
+
+async def _retry_backoff(attempt: int, what: str, error: Exception) -> None:
+    delay = min(_RETRY_MAX_DELAY_SECONDS, 0.05 * (2 ** attempt)) + random.uniform(0, 0.05)
+    reason = (
+        f"HTTP {error.response.status_code}"
+        if isinstance(error, httpx.HTTPStatusError)
+        else type(error).__name__
+    )
+    logger.warning("Retrying fetch of %s in %.2fs after %s", what, delay, reason)
+    await asyncio.sleep(delay)
+
+
+# Stored in place of a value to remember that the backend answered 404
+_NOT_FOUND = object()
+
+
+class _TTLCache:
+    """Bounded in-process cache whose entries expire ttl seconds after they are stored."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if time.monotonic() < expires_at:
+            return value
+        self._entries.pop(key, None)
+        return default
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value for ttl seconds (the cache's default TTL when not given)."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            # Drop expired entries so one-off keys don't accumulate
+            self._entries = {
+                k: entry for k, entry in self._entries.items() if now < entry[0]
+            }
+            # Still full: evict the oldest entries (dicts preserve insertion order)
+            while len(self._entries) >= self.max_entries > 0:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (now + ttl, value)
+
+    def pop(self, key: Any) -> None:
+        self._entries.pop(key, None)
+
+
 class APIService:
     def __init__(self):
         self.backend_url = os.getenv("BACKEND_CALLBACK_BASE_URL", "http://localhost:5000")
-        self._prompt_cache: Dict[str, Dict[str, Any]] = {}
-        self._prompt_cache_ttl = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300"))
-        logger.info(f"APIService initialized with backend_url: {self.backend_url}")
+        # Per-resource URL prefixes, built once; most calls only append an id and a suffix
+        self._conversations_url = f"{self.backend_url}/api/internal/conversations"
+        self._users_url = f"{self.backend_url}/api/internal/users"
+        self._prompts_url = f"{self.backend_url}/api/prompts"
+        self._internal_url = f"{self.backend_url}/api/internal"
+        self._memories_url = f"{self.backend_url}/api/memories"
+        self._user_personas_url = f"{self.backend_url}/api/user-personas"
+        self._prompt_cache = _TTLCache(
+            ttl=float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300")),
+            max_entries=int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1000")),
+        )
+        self._conversation_prompt_cache = _TTLCache(
+            ttl=float(os.getenv("CONVERSATION_PROMPT_CACHE_TTL_SECONDS", "300")),
+            max_entries=int(os.getenv("CONVERSATION_PROMPT_CACHE_MAX_ENTRIES", "10000")),
+        )
+        # A 404 for a persona or memory is remembered briefly so turns don't re-ask for it
+        self._not_found_ttl = float(os.getenv("NOT_FOUND_CACHE_TTL_SECONDS", "30"))
+        # Personas are regenerated in the background and core themes only change once a
+        # conversation reaches the extraction threshold, yet both are read on every turn.
+        self._user_persona_cache = _TTLCache(
+            ttl=float(os.getenv("USER_PERSONA_CACHE_TTL_SECONDS", "300")),
+            max_entries=int(os.getenv("USER_PERSONA_CACHE_MAX_ENTRIES", "10000")),
+        )
+        # Only ever holds memory 404s
+        self._conversation_memory_cache = _TTLCache(
+            ttl=self._not_found_ttl,
+            max_entries=int(os.getenv("CONVERSATION_MEMORY_CACHE_MAX_ENTRIES", "10000")),
+        )
+        self._core_theme_cache = _TTLCache(
+            ttl=float(os.getenv("CORE_THEME_CACHE_TTL_SECONDS", "60")),
+            max_entries=int(os.getenv("CORE_THEME_CACHE_MAX_ENTRIES", "10000")),
+        )
+        self._production_prompt_cache = _TTLCache(
+            ttl=float(os.getenv("PRODUCTION_PROMPT_CACHE_TTL_SECONDS", "30")),
+            max_entries=int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1000")),
+        )
+        # Fetches in progress, so concurrent misses for the same key share one request
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        logger.info("APIService initialized with backend_url: %s", self.backend_url)
+
+    async def _get_json(
+        self,
+        url: str,
+        what: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Any = httpx.USE_CLIENT_DEFAULT,
+        allow_404: bool = False,
+        retries: int = _GET_RETRIES,
+    ) -> Any:
+        """
+        GET url and decode its JSON body, retrying transient failures with jittered backoff.
+
+        Returns None (after logging against `what`) on request or HTTP status errors, and
+        _NOT_FOUND for a 404 when allow_404 is set so callers can tell "missing" from "failed".
+        Concurrent calls for the same URL and params share one request.
+        """
+        key = ("GET", url, tuple(sorted(params.items())) if params else None, allow_404)
+        return await self._single_flight(
+            key, lambda: self._get_json_once(url, what, params, timeout, allow_404, retries)
+        )
+
+    async def _get_json_once(
+        self,
+        url: str,
+        what: str,
+        params: Optional[Dict[str, Any]],
+        timeout: Any,
+        allow_404: bool,
+        retries: int,
+    ) -> Any:
+        for attempt in range(retries + 1):
+            try:
+                response = await backend_get(url, params=params, timeout=timeout)
+                if allow_404 and response.status_code == 404:
+                    return _NOT_FOUND
+                response.raise_for_status()
+                break
+            except BackendUnavailableError as e:
+                logger.error("Not fetching %s: %s", what, e)
+                return None
+            except _RETRYABLE_REQUEST_ERRORS as e:
+                if attempt < retries:
+                    await _retry_backoff(attempt, what, e)
+                    continue
+                logger.error("Error fetching %s: %s", what, e)
+                return None
+            except httpx.RequestError as e:
+                logger.error("Error fetching %s: %s", what, e)
+                return None
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in _RETRYABLE_STATUS_CODES and attempt < retries:
+                    await _retry_backoff(attempt, what, e)
+                    continue
+                logger.error("Error response %s while fetching %s: %s", e.response.status_code, what, e.response.text)
+                return None
+        return _parse_json(response)
+
+    async def _single_flight(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fetch() for key unless a fetch for the same key is already in progress, in which
+        case wait for that one; a caller being cancelled doesn't cancel the shared fetch.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
 
     async def save_memory(self, conversation_id: int, memory_data: Dict[str, Any]) -> bool:
         """
         Saves the generated memory for a conversation to the backend.
         """
-        url = f"{self.backend_url}/api/memories"
+        url = self._memories_url
         payload = {
             "conversation_id": conversation_id,
             "memory_data": memory_data
         }
         try:
-            # Use explicit timeout (30 seconds) to avoid hanging
-            timeout = httpx.Timeout(30.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Saving memory to: {url}")
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                logger.info(f"Successfully saved memory for conversation {conversation_id}")
-                return True
+            client = get_http_client()
+            logger.info("Saving memory to: %s", url)
+            response = await client.post(url, **_json_request_kwargs(payload), timeout=budgeted_timeout(BACKEND_REQUEST_TIMEOUT))
+            response.raise_for_status()
+            logger.info("Successfully saved memory for conversation %s", conversation_id)
+            return True
         except httpx.TimeoutException as e:
-            logger.error(f"Timeout saving memory for conversation {conversation_id}: {e}", exc_info=True)
+            logger.error("Timeout saving memory for conversation %s: %s", conversation_id, e)
             return False
         except httpx.RequestError as e:
-            logger.error(f"Request error saving memory for conversation {conversation_id}: {type(e).__name__}: {e}", exc_info=True)
+            logger.error("Request error saving memory for conversation %s: %s: %s", conversation_id, type(e).__name__, e)
             return False
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP {e.response.status_code} error while saving memory for conversation {conversation_id}: {e.response.text}", exc_info=True)
+            logger.error("HTTP %s error while saving memory for conversation %s: %s", e.response.status_code, conversation_id, e.response.text)
             return False
         except Exception as e:
-            logger.error(f"Unexpected error saving memory for conversation {conversation_id}: {type(e).__name__}: {e}", exc_info=True)
+            logger.error("Unexpected error saving memory for conversation %s: %s: %s", conversation_id, type(e).__name__, e, exc_info=True)
             return False
 
     async def get_conversation_history(self, conversation_id: int) -> Optional[List[Dict[str, Any]]]:
         """
         Fetches the full conversation history from the backend.
         """
-        url = f"{self.backend_url}/api/internal/conversations/{conversation_id}/messages_for_brain"
+        return await self._single_flight(
+            ("conversation_history", conversation_id),
+            lambda: self._fetch_conversation_history(conversation_id),
+        )
+
+    async def _fetch_conversation_history(self, conversation_id: int) -> Optional[List[Dict[str, Any]]]:
+        url = f"{self._conversations_url}/{conversation_id}/messages_for_brain"
         try:
-            # Use explicit timeout (30 seconds) to avoid hanging
-            timeout = httpx.Timeout(30.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Fetching conversation history from: {url}")
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                if data.get("success"):
-                    logger.info(f"Successfully fetched {len(data.get('messages', []))} messages for conversation {conversation_id}")
-                    return data.get("messages", [])
-                else:
-                    logger.warning(f"Backend indicated failure fetching history for conv {conversation_id}: {data.get('message')}")
-                    return None
+            logger.info("Fetching conversation history from: %s", url)
+            response = await backend_get(url)
+            response.raise_for_status()
+            data = _parse_json(response)
+            if data.get("success"):
+                logger.info("Successfully fetched %s messages for conversation %s", len(data.get('messages', [])), conversation_id)
+                return data.get("messages", [])
+            else:
+                logger.warning("Backend indicated failure fetching history for conv %s: %s", conversation_id, data.get('message'))
+                return None
         except httpx.TimeoutException as e:
-            logger.error(f"Timeout fetching conversation history for {conversation_id}: {e}", exc_info=True)
+            logger.error("Timeout fetching conversation history for %s: %s", conversation_id, e)
             return None
         except httpx.ConnectError as e:
-            logger.error(f"Connection error fetching conversation history for {conversation_id}. Backend URL: {url}. Error: {type(e).__name__}: {e}", exc_info=True)
-            logger.error(f"Is the backend running on {self.backend_url}?")
+            logger.error("Connection error fetching conversation history for %s. Backend URL: %s. Error: %s: %s", conversation_id, url, type(e).__name__, e)
+            logger.error("Is the backend running on %s?", self.backend_url)
             return None
         except httpx.RequestError as e:
-            logger.error(f"Request error fetching conversation history for {conversation_id}: {type(e).__name__}: {e}", exc_info=True)
+            logger.error("Request error fetching conversation history for %s: %s: %s", conversation_id, type(e).__name__, e)
             return None
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP {e.response.status_code} error while fetching history for {conversation_id}: {e.response.text}", exc_info=True)
+            logger.error("HTTP %s error while fetching history for %s: %s", e.response.status_code, conversation_id, e.response.text)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error fetching conversation history for {conversation_id}: {type(e).__name__}: {e}", exc_info=True)
+            logger.error("Unexpected error fetching conversation history for %s: %s: %s", conversation_id, type(e).__name__, e, exc_info=True)
             return None
 
     async def get_conversation_memories_for_user(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
         """
         Fetches all conversation memories for a specific user from the backend.
         """
-        url = f"{self.backend_url}/api/internal/users/{user_id}/memories"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                # Assuming the endpoint returns a list of memories directly
-                return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching conversation memories for user {user_id}: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching memories for user {user_id}: {e.response.text}")
-            return None
+        # Assuming the endpoint returns a list of memories directly
+        return await self._get_json(
+            f"{self._users_url}/{user_id}/memories", f"conversation memories for user {user_id}"
+        )
 
     async def get_conversation_memory(self, conversation_id: int) -> Optional[Dict[str, Any]]:
         """
         Fetch a single conversation's memory_data via internal endpoint.
         Returns the memory_data dict or None if not found (404).
         """
-        url = f"{self.backend_url}/api/internal/conversations/{conversation_id}/memory"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                if response.status_code == 404:
-                    logger.info(f"No memory found for conversation {conversation_id}.")
-                    return None
-                response.raise_for_status()
-                data = response.json()
-                return data.get("memory_data")
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching memory for conversation {conversation_id}: {e}")
+        if self._conversation_memory_cache.get(conversation_id) is _NOT_FOUND:
             return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching memory for conversation {conversation_id}: {e.response.text}")
+
+        data = await self._get_json(
+            f"{self._conversations_url}/{conversation_id}/memory",
+            f"memory for conversation {conversation_id}",
+            allow_404=True,
+        )
+        if data is _NOT_FOUND:
+            logger.info("No memory found for conversation %s.", conversation_id)
+            self._conversation_memory_cache.set(conversation_id, _NOT_FOUND)
             return None
+        return data.get("memory_data") if data else None
 
     async def get_user_persona(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
         Fetches the user persona for a specific user from the backend.
         Also augments it with student metadata (name) for use in prompts.
         """
+        cached = self._user_persona_cache.get(user_id)
+        if cached is _NOT_FOUND:
+            return None
+        if not cached:
+            cached = await self._single_flight(("user_persona", user_id), lambda: self._fetch_user_persona(user_id))
+        # Hand out a copy so a caller mutating its persona can't change the cached one
+        return dict(cached) if cached else cached
+
+    async def _fetch_user_persona(self, user_id: int) -> Optional[Dict[str, Any]]:
+        # The student record only supplies the name merged in below, so fetch it alongside
+        # the persona rather than after it.
         # Note: This endpoint is hypothetical and needs to be implemented in the backend.
-        url = f"{self.backend_url}/api/internal/users/{user_id}/persona"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                if response.status_code == 404:
-                    logger.info(f"No persona found for user {user_id}.")
-                    return None
-                response.raise_for_status()
-                # Assuming the endpoint returns the persona data directly
-                persona_data = response.json().get("persona_data")
-                
-                # Augment persona with student name for prompt injection
-                if persona_data:
-                    student = await self.get_student_by_user_id(user_id)
-                    if student:
-                        persona_data["_student_name"] = student.get("first_name")
-                        logger.info(f"Augmented persona with student name: {student.get('first_name')}")
-                
-                return persona_data
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching user persona for user {user_id}: {e}")
+        data, student = await asyncio.gather(
+            self._get_json(
+                f"{self._users_url}/{user_id}/persona", f"persona for user {user_id}", allow_404=True
+            ),
+            self.get_student_by_user_id(user_id),
+        )
+        if data is _NOT_FOUND:
+            logger.info("No persona found for user %s.", user_id)
+            self._user_persona_cache.set(user_id, _NOT_FOUND, ttl=self._not_found_ttl)
             return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching persona for user {user_id}: {e.response.text}")
+        if not data:
             return None
+        persona_data = data.get("persona_data")
+
+        # Augment persona with student name for prompt injection
+        if persona_data:
+            if student:
+                persona_data["_student_name"] = student.get("first_name")
+                logger.info("Augmented persona with student name: %s", student.get('first_name'))
+                self._user_persona_cache.set(user_id, persona_data)
+            else:
+                # The student lookup may have failed transiently; retry the name soon instead of
+                # serving the nameless persona for the full TTL.
+                self._user_persona_cache.set(user_id, persona_data, ttl=self._not_found_ttl)
+
+        return persona_data
 
     async def post_user_persona(self, user_id: int, persona_data: Dict[str, Any]) -> bool:
         """
         Posts the generated user persona to the backend.
         """
-        url = f"{self.backend_url}/api/user-personas"
+        url = self._user_personas_url
         payload = {
             "user_id": user_id,
             "persona_data": persona_data
         }
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                logger.info(f"Successfully posted persona for user {user_id}")
-                return True
+            client = get_http_client()
+            response = await client.post(url, **_json_request_kwargs(payload), timeout=budgeted_timeout(BACKEND_REQUEST_TIMEOUT))
+            response.raise_for_status()
+            self.invalidate_user_persona(user_id)
+            logger.info("Successfully posted persona for user %s", user_id)
+            return True
         except httpx.RequestError as e:
-            logger.error(f"Error posting persona for user {user_id}: {e}")
+            logger.error("Error posting persona for user %s: %s", user_id, e)
             return False
         except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while posting persona for user {user_id}: {e.response.text}")
+            logger.error("Error response %s while posting persona for user %s: %s", e.response.status_code, user_id, e.response.text)
             return False
 
     async def get_conversation_prompt(self, conversation_id: int) -> Optional[Dict[str, Any]]:
@@ -181,21 +383,34 @@ class APIService:
             Dict with keys: prompt_text, version_number, prompt_id
             None if conversation or prompt not found
         """
-        url = f"{self.backend_url}/api/internal/conversations/{conversation_id}/prompt"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                if response.status_code == 404:
-                    logger.warning(f"No prompt found for conversation {conversation_id}")
-                    return None
-                response.raise_for_status()
-                return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching conversation prompt for {conversation_id}: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching prompt for {conversation_id}: {e.response.text}")
+        cached = self._conversation_prompt_cache.get(conversation_id)
+        if not cached:
+            cached = await self._single_flight(
+                ("conversation_prompt", conversation_id),
+                lambda: self._fetch_conversation_prompt(conversation_id),
+            )
+        return dict(cached) if cached else cached
+
+    async def _fetch_conversation_prompt(self, conversation_id: int) -> Optional[Dict[str, Any]]:
+        prompt = await self._get_json(
+            f"{self._conversations_url}/{conversation_id}/prompt",
+            f"prompt for conversation {conversation_id}",
+            allow_404=True,
+        )
+        if prompt is _NOT_FOUND:
+            logger.warning("No prompt found for conversation %s", conversation_id)
             return None
+        if prompt:
+            self._conversation_prompt_cache.set(conversation_id, prompt)
+        return prompt
+
+    def invalidate_user_persona(self, user_id: int) -> None:
+        """Forget the cached persona for a user, e.g. after a new one was posted."""
+        self._user_persona_cache.pop(user_id)
+
+    def invalidate_conversation_core_theme(self, conversation_id: int) -> None:
+        """Forget the cached core theme for a conversation, e.g. after it was updated."""
+        self._core_theme_cache.pop(conversation_id)
 
     async def get_previous_memories(
         self, 
@@ -210,23 +425,28 @@ class APIService:
         Returns:
             List of memory_data dictionaries (empty list if none found)
         """
-        url = f"{self.backend_url}/api/internal/users/{user_id}/previous-memories"
+        url = f"{self._users_url}/{user_id}/previous-memories"
         params = {}
         if exclude_conversation_id:
             params["exclude_conversation_id"] = exclude_conversation_id
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                # Extract memory_data from each memory object
-                return [mem["memory_data"] for mem in data.get("memories", [])]
+            response = await backend_get(url, params=params)
+            response.raise_for_status()
+            # Decoding and projecting a long memory list needs no backend slot
+            data = _parse_json(response)
+            # Extract memory_data from each memory object, skipping malformed entries
+            # rather than losing the whole list to one KeyError
+            return [
+                mem["memory_data"]
+                for mem in data.get("memories", ())
+                if isinstance(mem, dict) and "memory_data" in mem
+            ]
         except httpx.RequestError as e:
-            logger.warning(f"Error fetching previous memories for user {user_id}: {e}")
+            logger.warning("Error fetching previous memories for user %s: %s", user_id, e)
             return []  # Return empty list on error (graceful degradation)
         except httpx.HTTPStatusError as e:
-            logger.warning(f"Error response {e.response.status_code} while fetching previous memories: {e.response.text}")
+            logger.warning("Error response %s while fetching previous memories: %s", e.response.status_code, e.response.text)
             return []
 
     async def get_student_by_user_id(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -236,21 +456,13 @@ class APIService:
         Returns:
             Student dict with id, user_id, school, grade, etc. or None if not found
         """
-        url = f"{self.backend_url}/api/internal/users/{user_id}/student"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                if response.status_code == 404:
-                    logger.warning(f"No student record found for user_id {user_id}")
-                    return None
-                response.raise_for_status()
-                return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching student for user {user_id}: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching student for user {user_id}: {e.response.text}")
+        student = await self._get_json(
+            f"{self._users_url}/{user_id}/student", f"student for user {user_id}", allow_404=True
+        )
+        if student is _NOT_FOUND:
+            logger.warning("No student record found for user_id %s", user_id)
             return None
+        return student
 
     async def get_student_conversation_transcript(self, student_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -260,23 +472,20 @@ class APIService:
         Returns:
             Dict with {"transcript": str, "conversation_count": int} or None if error
         """
-        url = f"{self.backend_url}/api/internal/student-transcript/{student_id}"
-        try:
-            timeout = httpx.Timeout(60.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Fetching conversation transcript from: {url}")
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                conversation_count = data.get("conversation_count", 0)
-                logger.info(f"Successfully fetched transcript for student {student_id}: {conversation_count} conversations")
-                return data
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching conversation transcript for student {student_id}: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching transcript for student {student_id}: {e.response.text}")
-            return None
+        url = f"{self._internal_url}/student-transcript/{student_id}"
+        logger.info("Fetching conversation transcript from: %s", url)
+        data = await self._get_json(
+            url,
+            f"conversation transcript for student {student_id}",
+            timeout=_TRANSCRIPT_TIMEOUT,
+            retries=0,
+        )
+        if data is not None:
+            logger.info(
+                "Successfully fetched transcript for student %s: %s conversations",
+                student_id, data.get("conversation_count", 0),
+            )
+        return data
 
     async def get_class_conversation_transcript(self, school: str, grade: int, section: Optional[str] = None) -> Optional[str]:
         """
@@ -286,29 +495,22 @@ class APIService:
         Returns:
             Formatted transcript string or None if error
         """
-        url = f"{self.backend_url}/api/internal/class-transcript"
+        url = f"{self._internal_url}/class-transcript"
         params = {"school": school, "grade": grade}
         if section:
             params["section"] = section
         
-        try:
-            timeout = httpx.Timeout(60.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Fetching class transcript from: {url} with params: {params}")
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                transcript = data.get("transcript", "")
-                student_count = data.get("student_count", 0)
-                conversation_count = data.get("conversation_count", 0)
-                logger.info(f"Successfully fetched class transcript: {student_count} students, {conversation_count} conversations")
-                return transcript
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching class transcript: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching class transcript: {e.response.text}")
+        logger.info("Fetching class transcript from: %s with params: %s", url, params)
+        data = await self._get_json(
+            url, "class transcript", params=params, timeout=_TRANSCRIPT_TIMEOUT, retries=0
+        )
+        if data is None:
             return None
+        logger.info(
+            "Successfully fetched class transcript: %s students, %s conversations",
+            data.get("student_count", 0), data.get("conversation_count", 0),
+        )
+        return data.get("transcript", "")
 
     async def send_analysis_callback(self, callback_url: str, payload: Dict[str, Any]) -> bool:
         """
@@ -319,88 +521,98 @@ class APIService:
             True if successful, False otherwise
         """
         try:
-            timeout = httpx.Timeout(30.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Sending analysis callback to {callback_url}")
-                response = await client.post(callback_url, json=payload)
-                response.raise_for_status()
-                logger.info(f"Successfully sent callback for job {payload.get('job_id')}")
-                return True
+            client = get_http_client()
+            logger.info("Sending analysis callback to %s", callback_url)
+            response = await client.post(callback_url, **_json_request_kwargs(payload), timeout=budgeted_timeout(BACKEND_REQUEST_TIMEOUT))
+            response.raise_for_status()
+            logger.info("Successfully sent callback for job %s", payload.get('job_id'))
+            return True
         except httpx.RequestError as e:
-            logger.error(f"Error sending callback: {e}")
+            logger.error("Error sending callback: %s", e)
             return False
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code} sending callback: {e.response.text}")
+            logger.error("HTTP error %s sending callback: %s", e.response.status_code, e.response.text)
             return False
         except Exception as e:
-            logger.error(f"Unexpected error sending callback: {e}")
+            logger.error("Unexpected error sending callback: %s", e)
             return False
 
-    async def get_prompt_template(self, prompt_name: str, prefer_production: bool = True) -> Optional[str]:
+    async def get_prompt_template(
+        self, prompt_name: str, prefer_production: bool = True, use_cache: bool = True
+    ) -> Optional[str]:
         """
         Fetch prompt template from backend.
-        Tries production version first (if prefer_production=True), then falls back to active.
+        Tries production version first (if prefer_production=True), which the backend already
+        resolves to the active version when none is marked production; active is only asked
+        for separately if that lookup fails for some other reason.
+
+        Set use_cache=False for a fresh read that is not cached either, e.g. for an active
+        version that is being edited.
         
         Returns:
             Prompt text string or None if not found
         """
         cache_key = f"{prompt_name}:{'production' if prefer_production else 'active'}"
-        if self._prompt_cache_ttl > 0:
+        if use_cache:
             cached = self._prompt_cache.get(cache_key)
             if cached:
-                age = time.time() - cached["fetched_at"]
-                if age < self._prompt_cache_ttl:
-                    logger.info(f"Using cached prompt '{prompt_name}'")
-                    return cached["prompt_text"]
-                self._prompt_cache.pop(cache_key, None)
+                logger.info("Using cached prompt '%s'", prompt_name)
+                return cached
+        return await self._single_flight(
+            ("prompt_template", cache_key, use_cache),
+            lambda: self._fetch_prompt_template(prompt_name, prefer_production, cache_key if use_cache else None),
+        )
+
+    async def _fetch_prompt_template(
+        self, prompt_name: str, prefer_production: bool, cache_key: Optional[str]
+    ) -> Optional[str]:
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Try production first (or active if prefer_production=False)
-                if prefer_production:
-                    version_url = f"{self.backend_url}/api/prompts/{prompt_name}/versions/production"
-                    logger.info(f"Fetching production prompt '{prompt_name}' from {version_url}")
-                    response = await client.get(version_url)
+            # Try production first (or active if prefer_production=False)
+            if prefer_production:
+                version_url = f"{self._prompts_url}/{prompt_name}/versions/production"
+                logger.info("Fetching production prompt '%s' from %s", prompt_name, version_url)
+                response = await backend_get(version_url, timeout=_PROMPT_TIMEOUT)
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        prompt_text = data.get("prompt_text")
-                        if prompt_text:
-                            logger.info(f"Successfully fetched production prompt '{prompt_name}'")
-                            if self._prompt_cache_ttl > 0:
-                                self._prompt_cache[cache_key] = {
-                                    "prompt_text": prompt_text,
-                                    "fetched_at": time.time(),
-                                }
-                            return prompt_text
-                    
-                    # Fall back to active
-                    logger.info(f"Production not found for '{prompt_name}', trying active version")
-                
-                # Try active version
-                active_url = f"{self.backend_url}/api/prompts/{prompt_name}/versions/active"
-                logger.info(f"Fetching active prompt '{prompt_name}' from {active_url}")
-                response = await client.get(active_url)
-                
                 if response.status_code == 200:
-                    data = response.json()
+                    data = _parse_json(response)
                     prompt_text = data.get("prompt_text")
                     if prompt_text:
-                        logger.info(f"Successfully fetched active prompt '{prompt_name}'")
-                        if self._prompt_cache_ttl > 0:
-                            self._prompt_cache[cache_key] = {
-                                "prompt_text": prompt_text,
-                                "fetched_at": time.time(),
-                            }
+                        logger.info("Successfully fetched production prompt '%s'", prompt_name)
+                        if cache_key is not None:
+                            self._prompt_cache.set(cache_key, prompt_text)
                         return prompt_text
+
+                if response.status_code == 404:
+                    # The production endpoint already serves the active version when no version
+                    # is marked production, so asking for active as well would just 404 again.
+                    logger.warning("Prompt '%s' not found in backend (no production or active version)", prompt_name)
+                    return None
+
+                # Fall back to active
+                logger.info("Production not found for '%s', trying active version", prompt_name)
                 
-                logger.warning(f"Prompt '{prompt_name}' not found in backend (tried production and active)")
-                return None
+            # Try active version
+            active_url = f"{self._prompts_url}/{prompt_name}/versions/active"
+            logger.info("Fetching active prompt '%s' from %s", prompt_name, active_url)
+            response = await backend_get(active_url, timeout=_PROMPT_TIMEOUT)
+                
+            if response.status_code == 200:
+                data = _parse_json(response)
+                prompt_text = data.get("prompt_text")
+                if prompt_text:
+                    logger.info("Successfully fetched active prompt '%s'", prompt_name)
+                    if cache_key is not None:
+                        self._prompt_cache.set(cache_key, prompt_text)
+                    return prompt_text
+                
+            logger.warning("Prompt '%s' not found in backend (tried production and active)", prompt_name)
+            return None
                 
         except httpx.RequestError as e:
-            logger.error(f"Error fetching prompt '{prompt_name}': {e}")
+            logger.error("Error fetching prompt '%s': %s", prompt_name, e)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error fetching prompt '{prompt_name}': {e}")
+            logger.error("Unexpected error fetching prompt '%s': %s", prompt_name, e)
             return None
 
     async def get_user_conversations(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -412,18 +624,9 @@ class APIService:
             Dict with keys: user_id, conversation_count, conversation_ids
             None if error
         """
-        url = f"{self.backend_url}/api/internal/users/{user_id}/conversations"
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"Error fetching conversations for user {user_id}: {e}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error response {e.response.status_code} while fetching conversations for user {user_id}: {e.response.text}")
-            return None
+        return await self._get_json(
+            f"{self._users_url}/{user_id}/conversations", f"conversations for user {user_id}"
+        )
 
     async def get_conversation_messages(self, conversation_id: int) -> List[Dict[str, Any]]:
         """
@@ -432,32 +635,34 @@ class APIService:
         Returns:
             List of message dictionaries (empty list if none found or error)
         """
-        url = f"{self.backend_url}/api/internal/conversations/{conversation_id}/messages_for_brain"
+        url = f"{self._conversations_url}/{conversation_id}/messages_for_brain"
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                return data.get("messages", []) if data.get("success") else []
+            response = await backend_get(url)
+            response.raise_for_status()
+            data = _parse_json(response)
+            return data.get("messages", []) if data.get("success") else []
         except Exception as e:
-            logger.warning(f"Error fetching messages for conversation {conversation_id}: {e}")
+            logger.warning("Error fetching messages for conversation %s: %s", conversation_id, e)
             return []
         
     async def get_conversation_core_theme(self, conversation_id: int) -> Optional[str]:
         """
         Fetch the core theme for a specific conversation from the backend.
         """
+        cached = self._core_theme_cache.get(conversation_id)
+        if cached:
+            return cached
         try:
-            backend_url = os.getenv("BACKEND_CALLBACK_BASE_URL", "http://localhost:5000")
-            url = f"{backend_url}/api/internal/conversations/{conversation_id}/core-theme"
+            url = f"{self._conversations_url}/{conversation_id}/core-theme"
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                return data.get("core_theme")
+            response = await backend_get(url)
+            response.raise_for_status()
+            core_theme = _parse_json(response).get("core_theme")
+            if core_theme:
+                self._core_theme_cache.set(conversation_id, core_theme)
+            return core_theme
         except Exception as e:
-            logger.error(f"Error fetching core theme for conversation {conversation_id}: {e}")
+            logger.error("Error fetching core theme for conversation %s: %s", conversation_id, e)
             return None    
 
     async def get_conversation_messages_with_pipeline(self, conversation_id: int) -> List[Dict[str, Any]]:
@@ -467,33 +672,42 @@ class APIService:
         Returns:
             List of message dictionaries with pipeline_data included
         """
-        url = f"{self.backend_url}/api/internal/conversations/{conversation_id}/messages_with_pipeline"
+        url = f"{self._conversations_url}/{conversation_id}/messages_with_pipeline"
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                return data.get("messages", []) if data.get("success") else []
+            response = await backend_get(url)
+            response.raise_for_status()
+            data = _parse_json(response)
+            return data.get("messages", []) if data.get("success") else []
         except Exception as e:
-            logger.warning(f"Error fetching messages with pipeline for conversation {conversation_id}: {e}")
+            logger.warning("Error fetching messages with pipeline for conversation %s: %s", conversation_id, e)
             return []
         
     async def get_production_prompt_version(self, prompt_name: str) -> Dict[str, Any]:
-        url = f"{self.backend_url}/api/prompts/{prompt_name}/versions/production"
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            return resp.json()
+        cached = self._production_prompt_cache.get(prompt_name)
+        if not cached:
+            cached = await self._single_flight(
+                ("production_prompt_version", prompt_name),
+                lambda: self._fetch_production_prompt_version(prompt_name),
+            )
+        return dict(cached)
+
+    async def _fetch_production_prompt_version(self, prompt_name: str) -> Dict[str, Any]:
+        url = f"{self._prompts_url}/{prompt_name}/versions/production"
+        resp = await backend_get(url)
+        resp.raise_for_status()
+        prompt_version = _parse_json(resp)
+        self._production_prompt_cache.set(prompt_name, prompt_version)
+        return prompt_version
 
         
     async def post_generic_flow_items(self, flow_slug: str, conversation_id: int, items: list) -> bool:
-        url = f"{self.backend_url}/api/internal/analytics/{flow_slug}/{conversation_id}"
+        url = f"{self._internal_url}/analytics/{flow_slug}/{conversation_id}"
         try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                await client.post(url, headers={"Content-Type": "application/json"}, json={"items": items})
+            client = get_http_client()
+            await client.post(url, **_json_request_kwargs({"items": items}), timeout=budgeted_timeout(_ANALYTICS_TIMEOUT))
             return True
         except Exception as e:
-            logger.error(f"Error posting items for flow {flow_slug} (conversation {conversation_id}): {e}")
+            logger.error("Error posting items for flow %s (conversation %s): %s", flow_slug, conversation_id, e)
             return False 
 
 
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional
+import httpx
+from src.utils.logger import logger
+
+# One pooled client per event loop. The FastAPI app runs a single loop for its lifetime,
+# while the Lambda handler calls asyncio.run() per record, so a client bound to a
+# previous (closed) loop is replaced rather than reused.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+HTTP_CLIENT_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# Explicit per-call timeout for backend requests, so a stuck backend can't hang a turn or a
+# batch job; calls that need a different budget pass their own.
+BACKEND_REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+# Opt-in HTTP/2 (multiplexed requests, HPACK header compression) for deployments where the
+# backend sits behind an HTTP/2-capable proxy; needs the optional h2 package (httpx[http2]).
+# httpx already requests gzip/deflate bodies and decompresses them transparently.
+HTTP2_ENABLED = os.getenv("BACKEND_HTTP2_ENABLED", "false").lower() == "true"
+
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("BACKEND_HTTP2_ENABLED is set but h2 is not installed; using HTTP/1.1")
+        return False
+    return True
+
+# Caps in-flight backend reads per turn-serving loop so a burst of conversations queues
+# here instead of stampeding the backend; bound to the loop like the client above.
+BACKEND_MAX_CONCURRENCY = int(os.getenv("BACKEND_MAX_CONCURRENCY", "32"))
+_backend_semaphore: Optional[asyncio.Semaphore] = None
+_backend_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _retire_stale_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close a client left behind by another event loop, or log that its connections are abandoned."""
+    if client.is_closed:
+        return
+    if loop is not None and loop.is_running():
+        # Its loop is still serving another thread; close the client over there
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        return
+    # Its connections belong to a loop that has stopped, so they can't be closed from here
+    logger.warning(
+        "Abandoning an unclosed shared httpx.AsyncClient from a finished event loop; "
+        "await close_http_client() before that loop exits to release its connections"
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive AsyncClient for the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        if _client is not None:
+            _retire_stale_client(_client, _client_loop)
+        logger.debug("Creating shared httpx.AsyncClient")
+        _client = httpx.AsyncClient(limits=HTTP_CLIENT_LIMITS, http2=_http2_available())
+        _client_loop = loop
+    return _client
+
+
+def get_backend_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent backend fetches on the running event loop."""
+    global _backend_semaphore, _backend_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _backend_semaphore is None or _backend_semaphore_loop is not loop:
+        _backend_semaphore = asyncio.Semaphore(BACKEND_MAX_CONCURRENCY)
+        _backend_semaphore_loop = loop
+    return _backend_semaphore
+
+
+class CircuitBreaker:
+    """
+    Fails backend reads fast once the backend looks down instead of letting every call wait
+    out its connect timeout. Opens after failure_threshold consecutive failures; once
+    cool_off_seconds pass, one call is let through as a probe and its outcome closes or
+    re-opens the breaker. A threshold of 0 disables it.
+    """
+
+    def __init__(self, failure_threshold: int, cool_off_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cool_off_seconds = cool_off_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.cool_off_seconds:
+            return False
+        # Half-open: this caller probes, everyone else waits out another cool-off
+        self._opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Backend reachable again; closing circuit breaker")
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if 0 < self.failure_threshold <= self._failures:
+            if self._opened_at is None:
+                logger.warning(
+                    "Opening backend circuit breaker after %s consecutive failures", self._failures
+                )
+            self._opened_at = time.monotonic()
+
+
+# Process-wide rather than per loop: a warm Lambda container should keep failing fast across
+# records while the backend is down.
+backend_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("BACKEND_BREAKER_FAILURE_THRESHOLD", "5")),
+    cool_off_seconds=float(os.getenv("BACKEND_BREAKER_COOL_OFF_SECONDS", "30")),
+)
+
+
+# Absolute time.monotonic() by which the current job's backend reads must be done, so a chain
+# of calls stops at the job's budget instead of each one waiting out its own full timeout.
+_backend_deadline: ContextVar[Optional[float]] = ContextVar("backend_deadline", default=None)
+
+
+def set_backend_deadline(budget_seconds: float) -> Token:
+    """Give backend calls in the current context budget_seconds from now to finish."""
+    return _backend_deadline.set(time.monotonic() + budget_seconds)
+
+
+def reset_backend_deadline(token: Token) -> None:
+    _backend_deadline.reset(token)
+
+
+def remaining_backend_budget() -> Optional[float]:
+    """Seconds left before the current deadline, or None when no deadline is set."""
+    deadline = _backend_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def budgeted_timeout(timeout=httpx.USE_CLIENT_DEFAULT):
+    """Clamp a per-call timeout to the remaining deadline budget, if there is one."""
+    remaining = remaining_backend_budget()
+    if remaining is None:
+        return timeout
+    if timeout is httpx.USE_CLIENT_DEFAULT:
+        timeout = get_http_client().timeout
+    elif not isinstance(timeout, httpx.Timeout):
+        timeout = httpx.Timeout(timeout)
+    cap = max(remaining, 0.0)
+    return httpx.Timeout(
+        connect=cap if timeout.connect is None else min(timeout.connect, cap),
+        read=cap if timeout.read is None else min(timeout.read, cap),
+        write=cap if timeout.write is None else min(timeout.write, cap),
+        pool=cap if timeout.pool is None else min(timeout.pool, cap),
+    )
+
+
+class BackendUnavailableError(httpx.RequestError):
+    """Raised by backend_get instead of sending a request the deadline or circuit breaker rules out."""
+
+
+# Answers that mean the backend (or its gateway) is down or overloaded, as opposed to a bad request
+_BREAKER_FAILURE_STATUS_CODES = frozenset({502, 503, 504})
+
+
+async def backend_get(
+    url: str, *, params: Optional[Dict[str, Any]] = None, timeout=BACKEND_REQUEST_TIMEOUT
+) -> httpx.Response:
+    """
+    GET a backend URL on the shared client, holding a backend slot only for the request.
+
+    The timeout is clamped to the current deadline and the outcome feeds backend_breaker.
+    Raises BackendUnavailableError without sending anything once the deadline has passed
+    or while the breaker is open; other failures surface as the usual httpx errors.
+    """
+    remaining = remaining_backend_budget()
+    if remaining is not None and remaining <= 0:
+        raise BackendUnavailableError(f"Deadline exceeded before GET {url}")
+    if not backend_breaker.allow():
+        raise BackendUnavailableError(f"Backend circuit open; not sending GET {url}")
+    try:
+        async with get_backend_semaphore():
+            response = await get_http_client().get(url, params=params, timeout=budgeted_timeout(timeout))
+    except (httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError):
+        backend_breaker.record_failure()
+        raise
+    if response.status_code in _BREAKER_FAILURE_STATUS_CODES:
+        backend_breaker.record_failure()
+    else:
+        backend_breaker.record_success()
+    return response
+
+
+async def close_http_client() -> None:
+    """Close the shared client if it belongs to the running event loop."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
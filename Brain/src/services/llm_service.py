@@ -1,19 +1,110 @@
+import asyncio
 import json
 import os
-from typing import Dict, Any, Optional
-from openai import OpenAI
-from groq import Groq
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from src.utils.logger import logger
 
 # Load environment variables
 load_dotenv()
 
+# Canned completions for APP_ENV=test, serialized once
+_MOCK_MEMORY_PROMPT_MARKER = "You are a meticulous educational analyst"
+_MOCK_MEMORY_RESPONSE = json.dumps({
+    "conversation_summary": "This is a mocked summary.",
+    "topics_discussed": [],
+    "student_profile_insights": {},
+    "future_conversation_hooks": []
+})
+_MOCK_SIMPLIFIED_CONVERSATION_RESPONSE = json.dumps({
+    "response": "This is a mocked simplified response.",
+    "needs_clarification": False,
+    "follow_up_questions": []
+})
+
+
+# Parsed config files and provider SDK clients are shared across LLMService instances so
+# constructing a service per request doesn't re-read JSON or rebuild HTTP connection pools.
+_CONFIG_CACHE: Dict[str, Dict[str, Any]] = {}
+_CLIENT_CACHE: Dict[Tuple[str, str], Any] = {}
+_ASYNC_CLIENT_CACHE: Dict[Tuple[str, str], Tuple[asyncio.AbstractEventLoop, Any]] = {}
+_default_llm_service: Optional["LLMService"] = None
+# Provider SDK client classes by (provider, is_async), imported on first use
+_PROVIDER_CLIENT_CLASSES: Dict[Tuple[str, bool], type] = {}
+
+# Upper bound on concurrent async provider calls per event loop, to stay under rate limits
+# during traffic bursts; excess callers wait for a slot instead of failing with 429s.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+_llm_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    loop = asyncio.get_running_loop()
+    if _llm_semaphore is None or _llm_semaphore[0] is not loop:
+        _llm_semaphore = (loop, asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+    return _llm_semaphore[1]
+
+
+def _provider_client_class(provider: str, is_async: bool) -> type:
+    """
+    Import a provider's SDK client class on first use. The openai and groq packages each take
+    a noticeable share of a Lambda cold start, and a process may only ever call one of them.
+    """
+    client_class = _PROVIDER_CLIENT_CLASSES.get((provider, is_async))
+    if client_class is not None:
+        return client_class
+    if provider == "openai":
+        from openai import AsyncOpenAI, OpenAI
+        client_class = AsyncOpenAI if is_async else OpenAI
+    elif provider == "groq":
+        from groq import AsyncGroq, Groq
+        client_class = AsyncGroq if is_async else Groq
+    else:
+        logger.error(f"Unsupported LLM provider: {provider}")
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    _PROVIDER_CLIENT_CLASSES[(provider, is_async)] = client_class
+    return client_class
+
+
+async def close_async_llm_clients() -> None:
+    """Close the async provider clients bound to the running event loop, before it goes away."""
+    loop = asyncio.get_running_loop()
+    for key, (client_loop, client) in list(_ASYNC_CLIENT_CACHE.items()):
+        if client_loop is loop:
+            del _ASYNC_CLIENT_CACHE[key]
+            await client.close()
+
+
+def _retire_stale_async_client(provider: str, loop: asyncio.AbstractEventLoop, client: Any) -> None:
+    """Close an async provider client left behind by another event loop, or log that it is abandoned."""
+    if client.is_closed():
+        return
+    if loop.is_running():
+        # Its loop is still serving another thread; close the client over there
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+        return
+    # Its connections belong to a loop that has stopped, so they can't be closed from here
+    logger.warning(
+        "Abandoning an unclosed async %s client from a finished event loop; "
+        "await close_async_llm_clients() before that loop exits to release its connections",
+        provider,
+    )
+
+
+def get_llm_service() -> "LLMService":
+    """Return a process-wide LLMService for the default config, creating it on first use."""
+    global _default_llm_service
+    if _default_llm_service is None:
+        _default_llm_service = LLMService()
+    return _default_llm_service
+
+
 class LLMService:
     """Factory class for LLM services with support for different configurations per call type"""
     
     def __init__(self, config_path: str = "config/llm_config.json"):
-        logger.debug(f"Initializing LLMService with config: {config_path}")
+        logger.debug("Initializing LLMService with config: %s", config_path)
         self.config = self._load_config(config_path)
         self.default_provider = self.config["default_provider"]
         logger.info(f"LLMService initialized with default provider: {self.default_provider}")
@@ -25,11 +116,16 @@ class LLMService:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             project_root = os.path.dirname(os.path.dirname(current_dir))
             config_abs_path = os.path.join(project_root, config_path)
+
+            cached_config = _CONFIG_CACHE.get(config_abs_path)
+            if cached_config is not None:
+                return cached_config
             
-            logger.debug(f"Loading config from: {config_abs_path}")
+            logger.debug("Loading config from: %s", config_abs_path)
             with open(config_abs_path, 'r') as f:
                 config = json.load(f)
             logger.debug("Successfully loaded LLM configuration")
+            _CONFIG_CACHE[config_abs_path] = config
             return config
         except FileNotFoundError:
             logger.error(f"LLM configuration file not found at {config_path}")
@@ -38,34 +134,122 @@ class LLMService:
             logger.error(f"Invalid JSON in configuration file at {config_path}")
             raise ValueError(f"Invalid JSON in configuration file at {config_path}")
     
-    def get_client(self, provider: str) -> Any:
-        """Get the appropriate LLM client based on provider"""
-        logger.debug(f"Getting client for provider: {provider}")
+    def _get_api_key(self, provider: str) -> str:
         api_key_env = self.config["providers"][provider]["api_key_env"]
         api_key = os.getenv(api_key_env)
         
         if not api_key:
             logger.error(f"API key not found for provider {provider} in environment variable {api_key_env}")
             raise ValueError(f"API key not found for provider {provider} in environment variable {api_key_env}")
+        return api_key
+
+    def get_client(self, provider: str) -> Any:
+        """Get the appropriate LLM client based on provider"""
+        logger.debug("Getting client for provider: %s", provider)
+        api_key = self._get_api_key(provider)
+            
+        cached_client = _CLIENT_CACHE.get((provider, api_key))
+        if cached_client is not None:
+            return cached_client
             
-        if provider == "openai":
-            logger.debug("Creating OpenAI client")
-            return OpenAI(api_key=api_key)
-        elif provider == "groq":
-            logger.debug("Creating Groq client")
-            return Groq(api_key=api_key)
-        else:
-            logger.error(f"Unsupported LLM provider: {provider}")
-            raise ValueError(f"Unsupported LLM provider: {provider}")
+        client_class = _provider_client_class(provider, is_async=False)
+        logger.debug("Creating %s client", client_class.__name__)
+        client = client_class(api_key=api_key)
+        _CLIENT_CACHE[(provider, api_key)] = client
+        return client
+
+    def get_async_client(self, provider: str) -> Any:
+        """Get the async LLM client for a provider, bound to the running event loop"""
+        logger.debug("Getting async client for provider: %s", provider)
+        api_key = self._get_api_key(provider)
+        loop = asyncio.get_running_loop()
+
+        # Async clients hold a connection pool tied to the loop that created them; the
+        # Lambda handler runs each record in a fresh loop, so never reuse across loops.
+        cached = _ASYNC_CLIENT_CACHE.get((provider, api_key))
+        if cached is not None:
+            if cached[0] is loop:
+                return cached[1]
+            _retire_stale_async_client(provider, *cached)
+
+        client_class = _provider_client_class(provider, is_async=True)
+        logger.debug("Creating %s client", client_class.__name__)
+        client = client_class(api_key=api_key)
+        _ASYNC_CLIENT_CACHE[(provider, api_key)] = (loop, client)
+        return client
     
     def get_call_config(self, call_type: str) -> Dict[str, Any]:
         """Get the configuration for a specific call type"""
-        logger.debug(f"Getting call configuration for type: {call_type}")
+        logger.debug("Getting call configuration for type: %s", call_type)
         if call_type not in self.config["calls"]:
             logger.error(f"Unknown call type: {call_type}")
             raise ValueError(f"Unknown call type: {call_type}")
         return self.config["calls"][call_type]
     
+    def _resolve_call_config(self, call_type: Optional[str]) -> Dict[str, Any]:
+        """Get the call configuration, falling back to response_generation when no call type is given"""
+        if call_type:
+            logger.debug("Using specific call type: %s", call_type)
+            return self.get_call_config(call_type)
+        logger.debug("Using default call type: response_generation")
+        return self.config["calls"]["response_generation"]  # ✅ Provider comes from call_config, not default
+
+    def _build_request_params(
+        self, call_config: Dict[str, Any], provider: str, messages: list, json_mode: bool
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Build SDK request parameters for a call.
+
+        Returns:
+            Tuple[bool, Dict[str, Any]]: Whether to use the Responses API, and the request parameters
+        """
+        model_name = call_config["model"]
+
+        # Check if model is GPT 5.x to use Responses API
+        if model_name.startswith("gpt-5") and provider == "openai":
+            # Use Responses API for GPT 5.1 and other GPT-5 models
+            request_params = {
+                "model": model_name,
+                "input": messages,  # Use 'input' instead of 'messages' for Responses API
+            }
+
+            # Add GPT-5 specific parameters if they exist in config
+            if "reasoning" in call_config:
+                request_params["reasoning"] = call_config["reasoning"]
+
+            if "text" in call_config:
+                request_params["text"] = call_config["text"]
+
+            return True, request_params
+
+        # Use Chat Completions API for older models (GPT-4, etc.) and non-OpenAI providers
+        request_params = {
+            "model": model_name,
+            "messages": messages,
+            "temperature": call_config["temperature"],
+            "max_tokens": call_config["max_tokens"]
+        }
+
+        if json_mode:
+            request_params["response_format"] = {"type": "json_object"}
+
+        return False, request_params
+
+    def _mock_completion(self, messages: list, call_type: Optional[str]) -> str:
+        """Canned completions used when APP_ENV is 'test'"""
+        logger.info(f"APP_ENV is 'test', returning mocked LLM completion for call_type: {call_type}")
+
+        # Memory generation sends its prompt as the first (only) message
+        first_content = messages[0].get("content", "") if messages else ""
+        if _MOCK_MEMORY_PROMPT_MARKER in first_content:
+            logger.info("Detected memory generation prompt, returning mocked memory JSON.")
+            return _MOCK_MEMORY_RESPONSE
+
+        if call_type == "simplified_conversation":
+            return _MOCK_SIMPLIFIED_CONVERSATION_RESPONSE
+
+        return "This is a mocked LLM response."
+
     def get_completion(self, messages: list, call_type: Optional[str] = None, json_mode: bool = False) -> str:
         """
         Get completion from the configured LLM provider
@@ -76,82 +260,77 @@ class LLMService:
             json_mode: Optional flag to enable JSON response format
         """
         if os.getenv("APP_ENV") == "test":
-            logger.info(f"APP_ENV is 'test', returning mocked LLM completion for call_type: {call_type}")
-
-            # Check for memory generation prompt
-            if any("You are a meticulous educational analyst" in msg.get("content", "") for msg in messages):
-                logger.info("Detected memory generation prompt, returning mocked memory JSON.")
-                return json.dumps({
-                    "conversation_summary": "This is a mocked summary.",
-                    "topics_discussed": [],
-                    "student_profile_insights": {},
-                    "future_conversation_hooks": []
-                })
-
-            if call_type == "simplified_conversation":
-                return json.dumps({
-                    "response": "This is a mocked simplified response.",
-                    "needs_clarification": False,
-                    "follow_up_questions": []
-                })
-
-            return "This is a mocked LLM response."
+            return self._mock_completion(messages, call_type)
 
         try:
-            if call_type:
-                logger.debug(f"Using specific call type: {call_type}")
-                call_config = self.get_call_config(call_type)
-                provider = call_config["provider"]
-            else:
-                logger.debug("Using default call type: response_generation")
-                call_config = self.config["calls"]["response_generation"]
-                provider = call_config["provider"]  # ✅ Use provider from call_config, not default
-            
+            call_config = self._resolve_call_config(call_type)
+            provider = call_config["provider"]
+
             logger.info(f"Making LLM call to {provider} with model {call_config['model']}")
             client = self.get_client(provider)
             
-            # Check if model is GPT 5.x to use Responses API
-            model_name = call_config["model"]
-            is_gpt5_model = model_name.startswith("gpt-5")
-            
-            if is_gpt5_model and provider == "openai":
-                # Use Responses API for GPT 5.1 and other GPT-5 models
-                request_params = {
-                    "model": model_name,
-                    "input": messages,  # Use 'input' instead of 'messages' for Responses API
-                }
-                
-                # Add GPT-5 specific parameters if they exist in config
-                if "reasoning" in call_config:
-                    request_params["reasoning"] = call_config["reasoning"]
-                
-                if "text" in call_config:
-                    request_params["text"] = call_config["text"]
-                
+            use_responses_api, request_params = self._build_request_params(call_config, provider, messages, json_mode)
+            if use_responses_api:
                 response = client.responses.create(**request_params)
                 logger.debug("Successfully received completion from LLM (Responses API)")
-                return response.output_text
+                completion = response.output_text
             else:
-                # Use Chat Completions API for older models (GPT-4, etc.) and non-OpenAI providers
-                request_params = {
-                    "model": model_name,
-                    "messages": messages,
-                    "temperature": call_config["temperature"],
-                    "max_tokens": call_config["max_tokens"]
-                }
-                
-                if json_mode:
-                    request_params["response_format"] = {"type": "json_object"}
-                
                 response = client.chat.completions.create(**request_params)
                 logger.debug("Successfully received completion from LLM (Chat Completions API)")
-            
-                return response.choices[0].message.content
-                
+                completion = response.choices[0].message.content
+
+            return completion
+
+        except Exception as e:
+            logger.error(f"Error getting completion: {str(e)}", exc_info=True)
+            raise
+
+    async def aget_completion(self, messages: list, call_type: Optional[str] = None, json_mode: bool = False) -> str:
+        """
+        Async variant of get_completion using the provider's async SDK client, so an
+        in-flight completion neither blocks the event loop nor occupies a worker thread
+        
+        Args:
+            messages: List of message dictionaries
+            call_type: Optional call type to use specific configuration
+            json_mode: Optional flag to enable JSON response format
+        """
+        if os.getenv("APP_ENV") == "test":
+            return self._mock_completion(messages, call_type)
+
+        try:
+            call_config = self._resolve_call_config(call_type)
+            provider = call_config["provider"]
+
+            return await self._acall_provider(call_config, provider, messages, json_mode)
+
         except Exception as e:
             logger.error(f"Error getting completion: {str(e)}", exc_info=True)
             raise
 
+    async def _acall_provider(
+        self,
+        call_config: Dict[str, Any],
+        provider: str,
+        messages: list,
+        json_mode: bool,
+    ) -> str:
+        logger.info(f"Making async LLM call to {provider} with model {call_config['model']}")
+        client = self.get_async_client(provider)
+
+        use_responses_api, request_params = self._build_request_params(call_config, provider, messages, json_mode)
+        async with _get_llm_semaphore():
+            if use_responses_api:
+                response = await client.responses.create(**request_params)
+                logger.debug("Successfully received completion from LLM (Responses API)")
+                completion = response.output_text
+            else:
+                response = await client.chat.completions.create(**request_params)
+                logger.debug("Successfully received completion from LLM (Chat Completions API)")
+                completion = response.choices[0].message.content
+
+        return completion
+
     def generate_response(self, final_prompt: str, call_type: Optional[str] = None, json_mode: bool = False) -> Dict[str, str]:
         """
         Generate a response from the final prompt and return it in a dictionary format.
@@ -164,7 +343,7 @@ class LLMService:
         Returns:
             Dict[str, str]: A dictionary with 'raw_response' as the key and the generated text as the value
         """
-        logger.debug(f"Generating response for prompt with call type: {call_type}, JSON mode: {json_mode}")
+        logger.debug("Generating response for prompt with call type: %s, JSON mode: %s", call_type, json_mode)
         messages = [
             {"role": "user", "content": final_prompt}
         ]
@@ -175,4 +354,23 @@ class LLMService:
             return {"raw_response": generated_text}
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}", exc_info=True)
-            raise 
+            raise
+
+    async def agenerate_response(self, final_prompt: str, call_type: Optional[str] = None, json_mode: bool = False) -> Dict[str, str]:
+        """
+        Async variant of generate_response built on aget_completion, for callers running on
+        the event loop.
+        """
+        logger.debug("Generating response for prompt with call type: %s, JSON mode: %s", call_type, json_mode)
+        messages = [
+            {"role": "user", "content": final_prompt}
+        ]
+
+        try:
+            generated_text = await self.aget_completion(messages, call_type, json_mode=json_mode)
+            logger.debug("Successfully generated response")
+            return {"raw_response": generated_text}
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}", exc_info=True)
+            raise
+
@@ -1,6 +1,8 @@
 import re
 import json
-from typing import List, Tuple, Dict, Any, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, FrozenSet, List, NamedTuple, Tuple, Dict, Any, Optional, Union
 from src.schemas import ConversationMemoryData, UserPersonaData
 
 
@@ -10,6 +12,11 @@ def _get_allowed_memory_keys() -> List[str]:
     except Exception:
         return ["curiosity_boosters", "invitation_to_come_back", "knowledge_journey", "kid_learning_profile"]
 
+
+# The schemas are fixed at import, so resolve the allowlists once rather than per placeholder
+_ALLOWED_MEMORY_KEYS: Tuple[str, ...] = tuple(_get_allowed_memory_keys())
+_ALLOWED_MEMORY_KEY_SET: FrozenSet[str] = frozenset(_ALLOWED_MEMORY_KEYS)
+
 # Conversation memory placeholder regex
 # Examples (all valid):
 #   {{CONVERSATION_MEMORY}}
@@ -18,6 +25,8 @@ def _get_allowed_memory_keys() -> List[str]:
 MEMORY_PLACEHOLDER_REGEX = re.compile(
     r"\{\{CONVERSATION_MEMORY(?:__([A-Za-z0-9_]+(?:__[A-Za-z0-9_]+)*))?\}\}"
 )
+# Literal prefix of every match, checked with a plain substring test before running a regex
+_MEMORY_MARKER = "{{CONVERSATION_MEMORY"
 
 
 # Persona placeholder regex
@@ -32,7 +41,13 @@ def _get_allowed_persona_keys() -> List[str]:
     except Exception:
         # Fallback to schema fields if UserPersonaData import fails
         return ["what_works", "what_doesnt_work", "interests", "learning_style", "engagement_triggers", "red_flags"]
+
+
+_ALLOWED_PERSONA_KEYS: Tuple[str, ...] = tuple(_get_allowed_persona_keys())
+_ALLOWED_PERSONA_KEY_SET: FrozenSet[str] = frozenset(_ALLOWED_PERSONA_KEYS)
+
 PERSONA_PLACEHOLDER_REGEX = re.compile(r"\{\{USER_PERSONA(?:__([A-Za-z0-9_]+(?:__[A-Za-z0-9_]+)*))?\}\}")
+_PERSONA_MARKER = "{{USER_PERSONA"
 
 # Previous conversations memory placeholder regex
 # Examples (all valid):
@@ -43,16 +58,20 @@ PERSONA_PLACEHOLDER_REGEX = re.compile(r"\{\{USER_PERSONA(?:__([A-Za-z0-9_]+(?:_
 PREVIOUS_MEMORY_PLACEHOLDER_REGEX = re.compile(
     r"\{\{PREVIOUS_CONVERSATIONS_MEMORY(?:__([A-Za-z0-9_]+(?:__[A-Za-z0-9_]+)*))?\}\}"
 )
+_PREVIOUS_MEMORY_MARKER = "{{PREVIOUS_CONVERSATIONS_MEMORY"
 
 # Core theme placeholder regex
 # Examples (all valid):
 #   {{CORE_THEME}}
 CORE_THEME_PLACEHOLDER_REGEX = re.compile(r'\{\{CORE_THEME(?:\|([^}]+))?\}\}')
+_CORE_THEME_MARKER = "{{CORE_THEME"
 
 def extract_core_theme_placeholders(template: str) -> List[Tuple[str, List[str]]]:
     """
     Returns list of (full_token, requested_keys[]) pairs for core theme placeholders.
     """
+    if _CORE_THEME_MARKER not in template:
+        return []
     results: List[Tuple[str, List[str]]] = []
     for match in CORE_THEME_PLACEHOLDER_REGEX.finditer(template):
         full_token = match.group(0)
@@ -75,21 +94,38 @@ def inject_core_theme_placeholder(template: str, core_theme: Optional[str]) -> s
     Returns:
         Template with placeholders replaced with core theme data
     """
-    placeholders = extract_core_theme_placeholders(template)
-    if not placeholders:
+    if _CORE_THEME_MARKER not in template:
         return template
+    replacement = _render_core_theme_token(core_theme)
+    return CORE_THEME_PLACEHOLDER_REGEX.sub(lambda _match: replacement, template)
+
+
+def _render_core_theme_token(core_theme: Optional[str]) -> str:
+    return core_theme if core_theme is not None else "No current theme as such"
+
 
-    if core_theme is None:
-        fallback = "No current theme as such"
-        for token, _ in placeholders:
-            template = template.replace(token, fallback)
+def _substitute_placeholders(
+    regex: re.Pattern, marker: str, template: str, render_token: Callable[[List[str]], str]
+) -> str:
+    """
+    Replaces every match of regex in one pass, rendering each distinct token once from its
+    "__"-separated key path (group 1). marker is the literal prefix every match starts with,
+    so templates without it skip the regex scan entirely.
+    """
+    if marker not in template:
         return template
+    rendered: Dict[str, str] = {}
 
-    # Replace each placeholder with the core theme
-    for token, _ in placeholders:
-        template = template.replace(token, core_theme)
-    
-    return template
+    def replace(match: re.Match) -> str:
+        token = match.group(0)
+        replacement = rendered.get(token)
+        if replacement is None:
+            keys_blob = match.group(1)
+            requested_keys = [part for part in keys_blob.split("__") if part] if keys_blob else []
+            replacement = rendered[token] = render_token(requested_keys)
+        return replacement
+
+    return regex.sub(replace, template)
 
 
 
@@ -155,6 +191,8 @@ def extract_memory_placeholders(template: str) -> List[Tuple[str, List[str]]]:
     Returns list of (full_token, requested_keys[]) pairs for conversation memory placeholders.
     requested_keys is empty for full injection.
     """
+    if _MEMORY_MARKER not in template:
+        return []
     results: List[Tuple[str, List[str]]] = []
     for match in MEMORY_PLACEHOLDER_REGEX.finditer(template):
         full_token = match.group(0)
@@ -175,16 +213,13 @@ def render_memory_snippet(
     Render a readable snippet for current conversation memory.
     Supports full injection and nested key selection.
     """
-    allowed = set(_get_allowed_memory_keys())
-
     if not requested_keys:
-        keys_to_render = _get_allowed_memory_keys()
-        parts = []
-        for key in keys_to_render:
-            value_str = _format_value_for_prompt(memory.get(key))
-            parts.append(f"`{key}` is \"{value_str}\"")
+        parts = [
+            f"`{key}` is \"{_format_value_for_prompt(memory.get(key))}\""
+            for key in _ALLOWED_MEMORY_KEYS
+        ]
     else:
-        if requested_keys[0] not in allowed:
+        if requested_keys[0] not in _ALLOWED_MEMORY_KEY_SET:
             return "Conversation memory not available."
 
         value = _get_nested_value(memory, requested_keys)
@@ -202,21 +237,15 @@ def inject_memory_placeholders(template: str, memory: Optional[Dict[str, Any]])
     """
     Replace current-conversation memory placeholders with readable snippets.
     """
-    placeholders = extract_memory_placeholders(template)
-    if not placeholders:
-        return template
-
-    if memory is None:
-        fallback = "Conversation memory not available."
-        for token, _ in placeholders:
-            template = template.replace(token, fallback)
-        return template
+    return _substitute_placeholders(
+        MEMORY_PLACEHOLDER_REGEX, _MEMORY_MARKER, template, lambda keys: _render_memory_token(memory, keys)
+    )
 
-    for token, requested_keys in placeholders:
-        snippet = render_memory_snippet(memory, requested_keys if requested_keys else None)
-        template = template.replace(token, snippet)
 
-    return template
+def _render_memory_token(memory: Optional[Dict[str, Any]], requested_keys: List[str]) -> str:
+    if memory is None:
+        return "Conversation memory not available."
+    return render_memory_snippet(memory, requested_keys if requested_keys else None)
 
 
 
@@ -226,6 +255,8 @@ def extract_persona_placeholders(template: str) -> List[Tuple[str, List[str]]]:
     Returns list of (full_token, requested_keys[]) pairs for persona placeholders.
     requested_keys is empty for full injection.
     """
+    if _PERSONA_MARKER not in template:
+        return []
     results: List[Tuple[str, List[str]]] = []
     for match in PERSONA_PLACEHOLDER_REGEX.finditer(template):
         full_token = match.group(0)
@@ -251,17 +282,14 @@ def render_persona_snippet(persona: Dict[str, Any], requested_keys: Optional[Lis
     """
     if not requested_keys:
         # Full injection mode - render all allowed top-level keys
-        keys_to_render = _get_allowed_persona_keys()
-        parts: List[str] = []
-        for key in keys_to_render:
-            value = persona.get(key)
-            value_str = _format_value_for_prompt(value)
-            parts.append(f"`{key}` is \"{value_str}\"")
+        parts: List[str] = [
+            f"`{key}` is \"{_format_value_for_prompt(persona.get(key))}\""
+            for key in _ALLOWED_PERSONA_KEYS
+        ]
     else:
         # Nested path mode - requested_keys is a single path like ['kid_learning_profile', 'attention_span']
         # Validate that the first key is allowed
-        allowed = set(_get_allowed_persona_keys())
-        if requested_keys[0] not in allowed:
+        if requested_keys[0] not in _ALLOWED_PERSONA_KEY_SET:
             return "User persona not available."
 
         # Get the nested value
@@ -304,37 +332,31 @@ def inject_persona_placeholders(template: str, persona: Optional[Dict[str, Any]]
     Returns:
         Template with placeholders replaced with persona data
     """
-    placeholders = extract_persona_placeholders(template)
-    if not placeholders:
-        return template
+    return _substitute_placeholders(
+        PERSONA_PLACEHOLDER_REGEX, _PERSONA_MARKER, template, lambda keys: _render_persona_token(persona, keys)
+    )
 
+
+def _render_persona_token(persona: Optional[Dict[str, Any]], requested_keys: List[str]) -> str:
     if persona is None:
-        fallback = "User persona not available yet (needs at least 3 completed conversations)."
-        for token, _ in placeholders:
-            template = template.replace(token, fallback)
-        return template
+        return "User persona not available yet (needs at least 3 completed conversations)."
 
-    # Replace each placeholder based on whether keys were specified
-    for token, requested_keys in placeholders:
-        if not requested_keys:
-            # Full injection mode - dump entire JSON
-            formatted = "=== PERSONALIZATION LAYER ===\n"
-            formatted += "Aggregated learning profile based on all previous conversations with this student.\n"
-            formatted += "Use this to personalize your teaching approach and build on what works.\n\n"
-            
-            # Add student name if available (injected by api_service)
-            student_name = persona.get("_student_name")
-            if student_name:
-                formatted += f"Student Name: {student_name}\n\n"
-            
-            formatted += json.dumps(persona, indent=2)
-            template = template.replace(token, formatted)
-        else:
-            # Selective injection mode - render only requested fields
-            snippet = render_persona_snippet(persona, requested_keys)
-            template = template.replace(token, snippet)
+    if requested_keys:
+        # Selective injection mode - render only requested fields
+        return render_persona_snippet(persona, requested_keys)
+
+    # Full injection mode - dump entire JSON
+    formatted = "=== PERSONALIZATION LAYER ===\n"
+    formatted += "Aggregated learning profile based on all previous conversations with this student.\n"
+    formatted += "Use this to personalize your teaching approach and build on what works.\n\n"
+
+    # Add student name if available (injected by api_service)
+    student_name = persona.get("_student_name")
+    if student_name:
+        formatted += f"Student Name: {student_name}\n\n"
 
-    return template
+    formatted += json.dumps(persona, indent=2)
+    return formatted
 
 
 def extract_previous_memory_placeholders(template: str) -> List[Tuple[str, List[str]]]:
@@ -347,6 +369,8 @@ def extract_previous_memory_placeholders(template: str) -> List[Tuple[str, List[
     - {{PREVIOUS_CONVERSATIONS_MEMORY__curiosity_boosters}} -> (..., ['curiosity_boosters'])
     - {{PREVIOUS_CONVERSATIONS_MEMORY__0__curiosity_boosters}} -> (..., ['0', 'curiosity_boosters'])
     """
+    if _PREVIOUS_MEMORY_MARKER not in template:
+        return []
     results: List[Tuple[str, List[str]]] = []
     for match in PREVIOUS_MEMORY_PLACEHOLDER_REGEX.finditer(template):
         full_token = match.group(0)
@@ -374,16 +398,19 @@ def render_previous_memories_snippet(
     """
     if not requested_keys:
         # Full dump mode
-        formatted = "=== PREVIOUS CONVERSATION MEMORIES ===\n"
-        formatted += "Below are complete memory analyses from previous conversations with this student.\n"
-        formatted += "Use this data to build continuity, reference past topics, and adapt to their learning style.\n\n"
+        # Collect the pieces and join once; memory dumps can be large and repeated += copies them
+        parts = [
+            "=== PREVIOUS CONVERSATION MEMORIES ===\n",
+            "Below are complete memory analyses from previous conversations with this student.\n",
+            "Use this data to build continuity, reference past topics, and adapt to their learning style.\n\n",
+        ]
 
         for idx, memory in enumerate(memories, 1):
-            formatted += f"--- Conversation {idx} ---\n"
-            formatted += json.dumps(memory, indent=2)
-            formatted += "\n\n"
+            parts.append(f"--- Conversation {idx} ---\n")
+            parts.append(json.dumps(memory, indent=2))
+            parts.append("\n\n")
 
-        return formatted.strip()
+        return "".join(parts).strip()
 
     # Check if first key is a number (specific conversation index)
     try:
@@ -445,23 +472,130 @@ def inject_previous_memories_placeholder(
     Returns:
         Template with placeholders replaced with memory data
     """
-    placeholders = extract_previous_memory_placeholders(template)
-    if not placeholders:
-        return template
+    return _substitute_placeholders(
+        PREVIOUS_MEMORY_PLACEHOLDER_REGEX, _PREVIOUS_MEMORY_MARKER, template, lambda keys: _render_previous_memories_token(memories, keys)
+    )
 
-    if not memories or len(memories) == 0:
-        fallback = "No previous conversation memories available."
-        for token, _ in placeholders:
-            template = template.replace(token, fallback)
-        return template
 
-    # Replace each placeholder based on requested keys
-    for token, requested_keys in placeholders:
-        snippet = render_previous_memories_snippet(
-            memories,
-            requested_keys if requested_keys else None
+def _render_previous_memories_token(
+    memories: Optional[List[Dict[str, Any]]],
+    requested_keys: List[str]
+) -> str:
+    if not memories:
+        return "No previous conversation memories available."
+    return render_previous_memories_snippet(memories, requested_keys if requested_keys else None)
+
+
+# Every placeholder the conversation prompt supports, matched in a single pass.
+# Nested keys use the same grammar as the per-family regexes above.
+_KEY_PATH_PATTERN = r"[A-Za-z0-9_]+(?:__[A-Za-z0-9_]+)*"
+PROMPT_PLACEHOLDER_REGEX = re.compile(
+    r"\{\{(?:"
+    r"(?P<value>CURRENT_CURIOSITY_SCORE|QUERY|CONVERSATION_HISTORY)"
+    rf"|(?P<memory>CONVERSATION_MEMORY)(?:__(?P<memory_keys>{_KEY_PATH_PATTERN}))?"
+    rf"|(?P<persona>USER_PERSONA)(?:__(?P<persona_keys>{_KEY_PATH_PATTERN}))?"
+    rf"|(?P<previous>PREVIOUS_CONVERSATIONS_MEMORY)(?:__(?P<previous_keys>{_KEY_PATH_PATTERN}))?"
+    r"|(?P<core_theme>CORE_THEME)(?:\|[^}]+)?"
+    r")\}\}"
+)
+
+
+class PromptPlaceholder(NamedTuple):
+    token: str
+    family: str
+    requested_keys: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPromptTemplate:
+    """A template split once into literal text and placeholder segments."""
+    segments: Tuple[Union[str, PromptPlaceholder], ...]
+    placeholders: FrozenSet[str]
+
+
+@lru_cache(maxsize=64)
+def compile_prompt_template(template: str) -> CompiledPromptTemplate:
+    """
+    Parses a template into segments so rendering is a join with no rescanning.
+    Cached per template text, since the same few templates are rendered on every turn.
+    """
+    segments: List[Union[str, PromptPlaceholder]] = []
+    position = 0
+    for match in PROMPT_PLACEHOLDER_REGEX.finditer(template):
+        if match.start() > position:
+            segments.append(template[position:match.start()])
+        family = (
+            match.group("value")
+            or match.group("memory")
+            or match.group("persona")
+            or match.group("previous")
+            or match.group("core_theme")
         )
-        template = template.replace(token, snippet)
+        keys_blob = match.group("memory_keys") or match.group("persona_keys") or match.group("previous_keys")
+        requested_keys = tuple(part for part in keys_blob.split("__") if part) if keys_blob else ()
+        segments.append(PromptPlaceholder(match.group(0), family, requested_keys))
+        position = match.end()
+    if position < len(template):
+        segments.append(template[position:])
+
+    return CompiledPromptTemplate(
+        segments=tuple(segments),
+        placeholders=frozenset(seg.family for seg in segments if isinstance(seg, PromptPlaceholder)),
+    )
+
 
-    return template
+def get_prompt_placeholder_families(template: str) -> FrozenSet[str]:
+    """
+    Returns which placeholder families a template uses, e.g. {"QUERY", "USER_PERSONA"}.
+    """
+    return compile_prompt_template(template).placeholders
+
+
+def render_prompt_placeholders(
+    template: str,
+    values: Dict[str, str],
+    *,
+    conversation_memory: Optional[Dict[str, Any]] = None,
+    user_persona: Optional[Dict[str, Any]] = None,
+    previous_memories: Optional[List[Dict[str, Any]]] = None,
+    core_theme: Optional[str] = None,
+) -> str:
+    """
+    Substitutes every supported placeholder using the template's compiled segments.
+
+    Args:
+        template: The prompt template with placeholders
+        values: Plain replacements for {{CURRENT_CURIOSITY_SCORE}}, {{QUERY}} and {{CONVERSATION_HISTORY}}
+        conversation_memory: Data for {{CONVERSATION_MEMORY...}} placeholders
+        user_persona: Data for {{USER_PERSONA...}} placeholders
+        previous_memories: Data for {{PREVIOUS_CONVERSATIONS_MEMORY...}} placeholders
+        core_theme: Data for {{CORE_THEME}} placeholders
+
+    Returns:
+        Template with placeholders replaced. Inserted text is never rescanned, so
+        placeholder-like text inside user input or memories is left as-is.
+    """
+    rendered: Dict[str, str] = {}
+    parts: List[str] = []
+    for segment in compile_prompt_template(template).segments:
+        if isinstance(segment, str):
+            parts.append(segment)
+            continue
+
+        replacement = rendered.get(segment.token)
+        if replacement is None:
+            keys = list(segment.requested_keys)
+            if segment.family == "CONVERSATION_MEMORY":
+                replacement = _render_memory_token(conversation_memory, keys)
+            elif segment.family == "USER_PERSONA":
+                replacement = _render_persona_token(user_persona, keys)
+            elif segment.family == "PREVIOUS_CONVERSATIONS_MEMORY":
+                replacement = _render_previous_memories_token(previous_memories, keys)
+            elif segment.family == "CORE_THEME":
+                replacement = _render_core_theme_token(core_theme)
+            else:
+                replacement = values.get(segment.family, segment.token)
+            rendered[segment.token] = replacement
+        parts.append(replacement)
 
+    return "".join(parts)
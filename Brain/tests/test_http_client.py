@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import threading
+import time
+
+import httpx
+import pytest
+
+from src.services import http_client
+from src.services.http_client import (
+    BackendUnavailableError,
+    CircuitBreaker,
+    budgeted_timeout,
+    reset_backend_deadline,
+    set_backend_deadline,
+)
+
+BACKEND_URL = "http://backend.test/api/prompts/visit_1/versions/active"
+
+
+class FakeClock:
+    """Stands in for time.monotonic so breaker cool-offs and deadlines don't need real sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(http_client.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    fresh_breaker = CircuitBreaker(failure_threshold=3, cool_off_seconds=30.0)
+    monkeypatch.setattr(http_client, "backend_breaker", fresh_breaker)
+    return fresh_breaker
+
+
+@pytest.fixture
+def no_shared_client(monkeypatch):
+    monkeypatch.setattr(http_client, "_client", None)
+    monkeypatch.setattr(http_client, "_client_loop", None)
+
+
+async def get_shared_client():
+    return http_client.get_http_client()
+
+
+def run_against_backend(monkeypatch, handler, call):
+    """Run call() on a fresh loop with backend_get's shared client replaced by a mock transport."""
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(http_client, "get_http_client", lambda: client)
+            return await call()
+
+    return asyncio.run(main())
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cool_off_seconds=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cool_off_seconds=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_breaker_half_opens_for_one_probe_after_cool_off(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cool_off_seconds=30.0)
+    breaker.record_failure()
+    clock.now += 29.0
+    assert not breaker.allow()
+
+    clock.now += 1.0
+    assert breaker.allow()
+    # Only the probe gets through while its outcome is pending
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_reopens_when_probe_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cool_off_seconds=30.0)
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.allow()
+
+    breaker.record_failure()
+    clock.now += 29.0
+    assert not breaker.allow()
+
+
+def test_breaker_with_zero_threshold_never_opens(clock):
+    breaker = CircuitBreaker(failure_threshold=0, cool_off_seconds=30.0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_backend_get_opens_breaker_after_repeated_5xx(monkeypatch, breaker):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    async def call():
+        for _ in range(3):
+            response = await http_client.backend_get(BACKEND_URL)
+            assert response.status_code == 503
+        with pytest.raises(BackendUnavailableError):
+            await http_client.backend_get(BACKEND_URL)
+
+    run_against_backend(monkeypatch, handler, call)
+    assert len(requests) == 3
+
+
+def test_backend_get_opens_breaker_after_repeated_timeouts(monkeypatch, breaker):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        raise httpx.ReadTimeout("backend did not answer", request=request)
+
+    async def call():
+        for _ in range(3):
+            with pytest.raises(httpx.ReadTimeout):
+                await http_client.backend_get(BACKEND_URL)
+        with pytest.raises(BackendUnavailableError):
+            await http_client.backend_get(BACKEND_URL)
+
+    run_against_backend(monkeypatch, handler, call)
+    assert len(requests) == 3
+
+
+def test_backend_get_client_errors_do_not_count_against_breaker(monkeypatch, breaker):
+    def handler(request):
+        return httpx.Response(404)
+
+    async def call():
+        for _ in range(5):
+            response = await http_client.backend_get(BACKEND_URL)
+            assert response.status_code == 404
+
+    run_against_backend(monkeypatch, handler, call)
+    assert breaker.allow()
+
+
+def test_backend_get_raises_before_sending_once_deadline_has_passed(monkeypatch, breaker):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    async def call():
+        token = set_backend_deadline(0.0)
+        try:
+            with pytest.raises(BackendUnavailableError):
+                await http_client.backend_get(BACKEND_URL)
+        finally:
+            reset_backend_deadline(token)
+
+    run_against_backend(monkeypatch, handler, call)
+    assert requests == []
+    # Skipping a request for lack of time says nothing about the backend's health
+    assert breaker.allow()
+
+
+def test_budgeted_timeout_passes_through_without_deadline():
+    timeout = httpx.Timeout(30.0, connect=10.0)
+    assert budgeted_timeout(timeout) is timeout
+
+
+def test_budgeted_timeout_clamps_to_remaining_budget(clock):
+    token = set_backend_deadline(5.0)
+    try:
+        timeout = budgeted_timeout(httpx.Timeout(30.0, connect=2.0))
+    finally:
+        reset_backend_deadline(token)
+    assert timeout == httpx.Timeout(connect=2.0, read=5.0, write=5.0, pool=5.0)
+
+
+def test_budgeted_timeout_clamps_plain_seconds(clock):
+    token = set_backend_deadline(5.0)
+    try:
+        timeout = budgeted_timeout(10.0)
+    finally:
+        reset_backend_deadline(token)
+    assert timeout == httpx.Timeout(5.0)
+
+
+def test_budgeted_timeout_is_zero_once_deadline_has_passed(clock):
+    token = set_backend_deadline(5.0)
+    clock.now += 6.0
+    try:
+        timeout = budgeted_timeout(httpx.Timeout(30.0))
+    finally:
+        reset_backend_deadline(token)
+    assert timeout == httpx.Timeout(0.0)
+
+
+def test_get_http_client_replaces_and_reports_client_from_finished_loop(no_shared_client, caplog):
+    first = asyncio.run(get_shared_client())
+    with caplog.at_level(logging.WARNING, logger="brain"):
+        second = asyncio.run(get_shared_client())
+    assert second is not first
+    assert "Abandoning an unclosed shared httpx.AsyncClient" in caplog.text
+
+
+def test_get_http_client_stays_quiet_when_client_was_closed_with_its_loop(no_shared_client, caplog):
+    async def use_and_close():
+        client = http_client.get_http_client()
+        await http_client.close_http_client()
+        return client
+
+    first = asyncio.run(use_and_close())
+    with caplog.at_level(logging.WARNING, logger="brain"):
+        second = asyncio.run(get_shared_client())
+    assert second is not first
+    assert "Abandoning" not in caplog.text
+
+
+def test_get_http_client_closes_stale_client_on_its_still_running_loop(no_shared_client):
+    other_loop = asyncio.new_event_loop()
+    other_thread = threading.Thread(target=other_loop.run_forever)
+    other_thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(get_shared_client(), other_loop).result(timeout=5)
+        second = asyncio.run(get_shared_client())
+        deadline = time.monotonic() + 5
+        while not first.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert first.is_closed
+        assert second is not first
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        other_thread.join()
+        other_loop.close()